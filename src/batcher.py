@@ -0,0 +1,164 @@
+"""
+Micro-batching of concurrent single-row /predict calls.
+
+Request threads hand their feature row to the batcher and block. A single
+background thread collects rows for up to `max_wait` seconds or `max_batch`
+rows, whichever comes first, stacks the rows for each modelType into one
+matrix, scores it with one model call and hands every waiting request its
+own row of the result. Under concurrent load this replaces many 1x16 model
+calls with a few larger ones; a lone request pays at most `max_wait` extra.
+
+Disabled unless FRAUD_MICROBATCH_SIZE is set above 1. FRAUD_MICROBATCH_WAIT_MS
+sets the collection window (default 2ms).
+"""
+import bisect
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Upper bounds (ms) of the added-latency histogram buckets; the last is +Inf
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 25.0, 50.0)
+
+
+def _size_buckets(max_batch):
+    buckets = [1]
+    while buckets[-1] < max_batch:
+        buckets.append(min(buckets[-1] * 2, max_batch))
+    return tuple(buckets)
+
+
+class MicroBatcher:
+    """
+    Coalesce rows submitted from many threads into batched calls of
+    `score_fn(key, X)`, which must return a tuple of arrays with one entry
+    per row of X (e.g. inference.score's (predictions, confidence)).
+    """
+
+    def __init__(self, score_fn, max_batch=32, max_wait=0.002, clock=time.perf_counter):
+        self.score_fn = score_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.clock = clock
+        self.size_buckets = _size_buckets(max(max_batch, 1))
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._reset_stats()
+
+    @property
+    def enabled(self):
+        return self.max_batch > 1
+
+    def _reset_stats(self):
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.batch_sizes = [0] * len(self.size_buckets)
+        self.latency = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def _ensure_started(self):
+        # Threads don't survive fork, so a preloaded gunicorn master and each
+        # of its workers start their own collector on first use
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name='microbatch', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, key, row):
+        """
+        Queue one feature row for `key` and return a Future of the tuple of
+        per-row results
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((key, np.asarray(row, dtype=np.float64), future, self.clock()))
+        return future
+
+    def __call__(self, key, row):
+        return self.submit(key, row).result()
+
+    def _collect(self, first):
+        items = [first]
+        deadline = self.clock() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect(self._queue.get())
+            started = self.clock()
+            groups = {}
+            for item in items:
+                groups.setdefault(item[0], []).append(item)
+            for key, group in groups.items():
+                self._score_group(key, group)
+            self._record(items, started)
+
+    def _score_group(self, key, group):
+        try:
+            results = self.score_fn(key, np.vstack([row for _, row, _, _ in group]))
+        except Exception as e:
+            with self._lock:
+                self.errors += len(group)
+            for _, _, future, _ in group:
+                future.set_exception(e)
+            return
+        for i, (_, _, future, _) in enumerate(group):
+            future.set_result(tuple(result[i] for result in results))
+
+    def _record(self, items, started):
+        with self._lock:
+            self.requests += len(items)
+            self.batches += 1
+            self.batch_sizes[bisect.bisect_left(self.size_buckets, len(items))] += 1
+            for _, _, _, enqueued in items:
+                waited_ms = (started - enqueued) * 1000
+                self.latency[bisect.bisect_left(LATENCY_BUCKETS_MS, waited_ms)] += 1
+                self.latency_sum += waited_ms
+                self.latency_max = max(self.latency_max, waited_ms)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': self._queue.qsize() if self._pid == os.getpid() else 0,
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'batch_size_histogram': {str(bound): count for bound, count
+                                         in zip(self.size_buckets, self.batch_sizes)},
+                'added_latency_ms': {
+                    'mean': self.latency_sum / self.requests if self.requests else 0.0,
+                    'max': self.latency_max,
+                    'histogram': {str(bound): count for bound, count
+                                  in zip(LATENCY_BUCKETS_MS + ('+Inf',), self.latency)},
+                },
+            }
+
+
+def batcher_from_env(score_fn):
+    return MicroBatcher(score_fn,
+                        max_batch=int(os.environ.get('FRAUD_MICROBATCH_SIZE', 0)),
+                        max_wait=float(os.environ.get('FRAUD_MICROBATCH_WAIT_MS', 2)) / 1000)
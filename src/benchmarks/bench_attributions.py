@@ -0,0 +1,55 @@
+"""
+Attribution cost against raw prediction cost for the tree models.
+
+Prediction is timed both through sklearn and through the registry's flat
+forest, which is what /predict actually evaluates; the ratio is against the
+flat forest. Before timing, every batch checks that bias plus contributions
+add up to the flat forest's probability.
+
+    python -m benchmarks.bench_attributions --rows 1 100 10000
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from benchmarks.synthetic import random_features
+from models.attributions import tree_attributions
+from models.registry import registry
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    warnings.simplefilter('ignore')
+
+    print(f"{'model':<15}{'rows':>8}{'sklearn ms':>12}{'flat ms':>10}{'attribute ms':>14}{'ratio':>8}")
+    for model_type in ('decision_tree', 'random_forest'):
+        entry = registry.get(model_type)
+        for n_rows in args.rows:
+            X = random_features(n_rows)
+            bias, contributions = tree_attributions(entry, X)
+            np.testing.assert_allclose(bias + contributions.sum(axis=1), entry.forest.predict_proba(X),
+                                       rtol=0, atol=1e-9)
+
+            sklearn = best_of(lambda: entry.model.predict_proba(entry.scaler.transform(X)), args.repeat)
+            flat = best_of(lambda: entry.forest.predict_proba(X), args.repeat)
+            attribute = best_of(lambda: tree_attributions(entry, X), args.repeat)
+            print(f'{model_type:<15}{n_rows:>8}{sklearn * 1e3:>12.3f}{flat * 1e3:>10.3f}'
+                  f'{attribute * 1e3:>14.3f}{attribute / flat:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
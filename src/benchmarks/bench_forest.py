@@ -0,0 +1,33 @@
+"""
+Latency and throughput of the flat forest evaluator against sklearn.
+
+    python -m benchmarks.bench_forest --rows 1 100 100000
+"""
+import argparse
+import warnings
+
+from benchmarks.bench_attributions import best_of
+from benchmarks.synthetic import random_features
+from models.registry import registry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 100, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    warnings.simplefilter('ignore')
+
+    print(f"{'model':<15}{'rows':>8}{'sklearn ms':>12}{'flat ms':>10}{'sklearn rows/s':>16}{'flat rows/s':>14}")
+    for model_type in ('decision_tree', 'random_forest'):
+        entry = registry.get(model_type)
+        for n_rows in args.rows:
+            X = random_features(n_rows)
+            sklearn = best_of(lambda: entry.model.predict_proba(entry.scaler.transform(X)), args.repeat)
+            flat = best_of(lambda: entry.forest.predict_proba(X), args.repeat)
+            print(f'{model_type:<15}{n_rows:>8}{sklearn * 1e3:>12.3f}{flat * 1e3:>10.3f}'
+                  f'{n_rows / sklearn:>16,.0f}{n_rows / flat:>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
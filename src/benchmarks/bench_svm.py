@@ -0,0 +1,98 @@
+"""
+Fit time, held-out quality and artifact size of the SVM training modes.
+
+    python -m benchmarks.bench_svm --rows 5000 20000 100000
+
+Every mode trains on the same synthetic split. The kernel SVC and LinearSVC
+train on the SMOTE-resampled split as models.train does; streaming SGD uses
+class weights on the original rows, fed in chunks through partial_fit as
+`--svm-solver sgd` does. SVC is skipped above --svc-max-rows.
+"""
+import argparse
+import pickle
+import time
+import warnings
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_training_frame
+from models.svm import build_linear_svm, build_sgd_svm, build_svm
+from models.train import PREPROCESSING, STREAM_CHUNK_ROWS, STREAM_EPOCHS, TARGET
+
+
+def split(df):
+    from imblearn.over_sampling import SMOTE
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X = df.drop(columns=[TARGET]).to_numpy()
+    y = df[TARGET].to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=PREPROCESSING['test_size'], random_state=PREPROCESSING['split_random_state'])
+    X_smote, y_smote = SMOTE(random_state=PREPROCESSING['smote_random_state']).fit_resample(X_train, y_train)
+    scaler = StandardScaler().fit(X_smote)
+    return {
+        'X_smote': scaler.transform(X_smote), 'y_smote': y_smote,
+        'X_train': scaler.transform(X_train), 'y_train': y_train,
+        'X_test': scaler.transform(X_test), 'y_test': y_test,
+    }
+
+
+def fit_batch(build, data):
+    model = build()
+    model.fit(data['X_smote'], data['y_smote'])
+    return model
+
+
+def fit_streaming(data, chunk_rows=STREAM_CHUNK_ROWS, epochs=STREAM_EPOCHS):
+    y = data['y_train']
+    counts = np.bincount(y, minlength=2)
+    model = build_sgd_svm({label: len(y) / (2 * count) for label, count in enumerate(counts) if count})
+    for _ in range(epochs):
+        for start in range(0, len(y), chunk_rows):
+            model.partial_fit(data['X_train'][start:start + chunk_rows], y[start:start + chunk_rows],
+                              classes=[0, 1])
+    return model
+
+
+def quality(model, data):
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+    scores = model.decision_function(data['X_test'])
+    predictions = model.predict(data['X_test'])
+    return (accuracy_score(data['y_test'], predictions), f1_score(data['y_test'], predictions),
+            roc_auc_score(data['y_test'], scores))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[5000, 20000, 100000])
+    parser.add_argument('--svc-max-rows', type=int, default=20000)
+    parser.add_argument('--chunk-rows', type=int, default=10000)
+    args = parser.parse_args(argv)
+    warnings.simplefilter('ignore')
+
+    modes = {
+        'svc': lambda data: fit_batch(build_svm, data),
+        'linear': lambda data: fit_batch(build_linear_svm, data),
+        'sgd': lambda data: fit_streaming(data, args.chunk_rows),
+    }
+    print(f"{'rows':>8}  {'mode':<8}{'fit s':>9}{'accuracy':>10}{'f1':>8}{'roc_auc':>9}"
+          f"{'pickle KB':>11}{'support vectors':>17}")
+    for n_rows in args.rows:
+        data = split(synthetic_training_frame(n_rows, seed=n_rows))
+        for mode, fit in modes.items():
+            if mode == 'svc' and n_rows > args.svc_max_rows:
+                print(f'{n_rows:>8}  {mode:<8}{"skipped":>9}')
+                continue
+            start = time.perf_counter()
+            model = fit(data)
+            seconds = time.perf_counter() - start
+            accuracy, f1, roc_auc = quality(model, data)
+            size_kb = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024
+            support = len(getattr(model, 'support_', ())) or '-'
+            print(f'{n_rows:>8}  {mode:<8}{seconds:>9.3f}{accuracy:>10.4f}{f1:>8.4f}{roc_auc:>9.4f}'
+                  f'{size_kb:>11.1f}{support:>17}')
+
+
+if __name__ == '__main__':
+    main()
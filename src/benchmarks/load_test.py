@@ -0,0 +1,263 @@
+"""
+Load test for the scoring API with regression tracking against a baseline.
+
+    python -m benchmarks.load_test --out results.json
+    python -m benchmarks.load_test --baseline benchmarks/baseline.json --threshold 0.3
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --models random_forest
+
+Without --url the Flask app is driven in process through its test client,
+which also allows cold-start runs (models unloaded before every request).
+With --url a running server is loaded over HTTP and only warm scenarios run.
+
+Every round replays the same payloads, so the prediction cache would turn
+all but the first round into cache lookups. It is disabled for in-process
+runs; start a server under test with FRAUD_CACHE_SIZE=0.
+
+Every modelType (and the ensemble) is measured for single /predict calls and
+/predict_batch calls, cold and warm, batches with and without explanations
+(/predict always includes them). Each scenario reports p50/p95/p99 latency
+and request and row throughput, from the fastest of --rounds runs.
+
+With --baseline the run fails (exit status 1) when a scenario's p95 latency
+rises or its row throughput drops by more than --threshold. Baselines are
+only comparable on the same machine: record one with --save-baseline there.
+benchmarks/baseline.json was recorded on a single-core VM whose run-to-run
+variation is around 30%, hence the default threshold of 0.5.
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import urllib.request
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_filings
+from models.registry import MODEL_TYPES
+
+ENSEMBLE = 'ensemble'
+
+
+class InProcessTarget:
+    """
+    The Flask app in this process
+    """
+    supports_cold = True
+
+    def __init__(self):
+        import app
+        self.app = app
+        self.client = app.app.test_client()
+        self._cache_size = app.prediction_cache.maxsize
+        app.prediction_cache.maxsize = 0
+        app.prediction_cache.invalidate()
+
+    def close(self):
+        # Restore the prediction cache
+        self.app.prediction_cache.maxsize = self._cache_size
+
+    def post(self, path, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code
+
+    def reset(self):
+        from models.registry import registry
+        registry.unload()
+
+
+class HttpTarget:
+    """
+    A server listening at `url`
+    """
+    supports_cold = False
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+
+    def post(self, path, payload):
+        request = urllib.request.Request(self.url + path, data=json.dumps(payload).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def _timed(target, path, payload):
+    start = time.perf_counter()
+    status = target.post(path, payload)
+    return time.perf_counter() - start, status
+
+
+def summarize(latencies, statuses, rows_per_request, wall_seconds):
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    n_requests = len(latencies)
+    return {
+        'requests': n_requests,
+        'rows': n_requests * rows_per_request,
+        'errors': sum(status != 200 for status in statuses),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'mean_ms': float(latencies_ms.mean()),
+        'requests_per_sec': n_requests / wall_seconds,
+        'rows_per_sec': n_requests * rows_per_request / wall_seconds,
+    }
+
+
+def build_payloads(model_type, mode, explain, n_requests, batch_size, seed):
+    if mode == 'single':
+        return '/predict', [dict(record, modelType=model_type)
+                            for record in synthetic_filings(n_requests, seed)]
+    records = synthetic_filings(n_requests * batch_size, seed)
+    return '/predict_batch', [
+        {'modelType': model_type, 'explain': explain, 'records': records[i:i + batch_size]}
+        for i in range(0, len(records), batch_size)
+    ]
+
+
+def run_warm(target, path, payloads, rows_per_request, concurrency):
+    # One untimed request so the models are loaded
+    target.post(path, payloads[0])
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        timings = list(pool.map(lambda payload: _timed(target, path, payload), payloads))
+    wall_seconds = time.perf_counter() - start
+    latencies, statuses = zip(*timings)
+    return summarize(latencies, statuses, rows_per_request, wall_seconds)
+
+
+def run_cold(target, path, payloads, rows_per_request):
+    latencies, statuses = [], []
+    for payload in payloads:
+        target.reset()
+        latency, status = _timed(target, path, payload)
+        latencies.append(latency)
+        statuses.append(status)
+    return summarize(latencies, statuses, rows_per_request, sum(latencies))
+
+
+def best_round(run, rounds):
+    # Like best_of in the micro benchmarks: the fastest of several rounds is
+    # the least disturbed by other load on the machine
+    return max((run() for _ in range(rounds)), key=lambda summary: summary['rows_per_sec'])
+
+
+def run_scenarios(target, model_types, n_requests, concurrency, batch_size, n_batches, cold_repeats,
+                  rounds=3):
+    results = {}
+    seed = 0
+    for model_type in model_types:
+        for mode, explain_options in (('single', (True,)), ('batch', (False, True))):
+            rows_per_request = 1 if mode == 'single' else batch_size
+            count = n_requests if mode == 'single' else n_batches
+            for explain in explain_options:
+                name = f"{model_type}/{mode}{'/explain' if explain and mode == 'batch' else ''}"
+                seed += 1
+                path, payloads = build_payloads(model_type, mode, explain, count, batch_size, seed)
+                results[f'{name}/warm'] = best_round(
+                    lambda: run_warm(target, path, payloads, rows_per_request, concurrency), rounds)
+                if target.supports_cold and cold_repeats:
+                    results[f'{name}/cold'] = best_round(
+                        lambda: run_cold(target, path, payloads[:cold_repeats], rows_per_request), rounds)
+    return results
+
+
+def compare(results, baseline, threshold=0.5, min_delta_ms=0.5):
+    """
+    Regressions of `results` against `baseline` (both {scenario: summary}):
+    p95 latency more than `threshold` (and `min_delta_ms`) above the
+    baseline, or row throughput more than `threshold` below it. Scenarios
+    missing from either side are skipped.
+    """
+    regressions = []
+    for name, base in sorted(baseline.items()):
+        current = results.get(name)
+        if current is None:
+            continue
+        if (current['p95_ms'] > base['p95_ms'] * (1 + threshold)
+                and current['p95_ms'] - base['p95_ms'] > min_delta_ms):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+        if current['rows_per_sec'] < base['rows_per_sec'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['rows_per_sec']:,.0f} -> "
+                               f"{current['rows_per_sec']:,.0f} rows/s")
+        if current['errors'] > base['errors']:
+            regressions.append(f"{name}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def print_table(results, out=sys.stdout):
+    print(f"{'scenario':<42}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}{'rows/s':>12}{'errors':>8}",
+          file=out)
+    for name, summary in results.items():
+        print(f"{name:<42}{summary['p50_ms']:>9.2f}{summary['p95_ms']:>9.2f}{summary['p99_ms']:>9.2f}"
+              f"{summary['requests_per_sec']:>10,.0f}{summary['rows_per_sec']:>12,.0f}{summary['errors']:>8}",
+              file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='load a running server (started with FRAUD_CACHE_SIZE=0) '
+                                      'instead of the in-process app')
+    parser.add_argument('--models', nargs='+', default=list(MODEL_TYPES) + [ENSEMBLE])
+    parser.add_argument('--requests', type=int, default=200, help='single-row requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--batches', type=int, default=20, help='batch requests per scenario')
+    parser.add_argument('--cold-repeats', type=int, default=5, help='cold requests per scenario')
+    parser.add_argument('--rounds', type=int, default=3, help='runs per scenario; the fastest is kept')
+    parser.add_argument('--out', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against this results file')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='allowed relative regression of p95 latency and row throughput')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write the results to --baseline instead of comparing')
+    args = parser.parse_args(argv)
+    warnings.simplefilter('ignore')
+
+    target = HttpTarget(args.url) if args.url else InProcessTarget()
+    try:
+        results = run_scenarios(target, args.models, args.requests, args.concurrency,
+                                args.batch_size, args.batches, args.cold_repeats, args.rounds)
+    finally:
+        if not args.url:
+            target.close()
+    print_table(results)
+
+    report = {
+        'meta': {
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'target': args.url or 'test_client',
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        return 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
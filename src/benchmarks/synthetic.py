@@ -0,0 +1,68 @@
+"""
+Synthetic tax filings with the same 8 raw inputs the API takes.
+
+Income and business revenue are log-normal at roughly the scale of the
+training data, and spending items are drawn as shares of the filer's true
+income. A `suspicious_share` of filings declare only part of that income, so
+every model sees both outcomes.
+"""
+import numpy as np
+
+from features import FEATURE_COLUMNS, REQUEST_FIELDS, engineer_features
+
+
+def synthetic_raw(n_rows, seed=0, suspicious_share=0.3):
+    """
+    (n_rows, 8) raw input matrix ordered as features.RAW_COLUMNS
+    """
+    rng = np.random.default_rng(seed)
+    revenue = np.where(rng.random(n_rows) < 0.8, rng.lognormal(13.8, 0.9, n_rows), 0.0)
+    true_income = np.maximum(rng.lognormal(12.6, 0.7, n_rows), 0.2 * revenue)
+    # Suspicious filings declare 10-60% of what they earn
+    declared_share = np.where(rng.random(n_rows) < suspicious_share, rng.uniform(0.1, 0.6, n_rows), 1.0)
+    income = true_income * declared_share
+
+    raw = np.column_stack([
+        income,
+        revenue,
+        true_income * rng.uniform(0.2, 0.5, n_rows),
+        true_income * rng.uniform(0.0, 0.2, n_rows),
+        true_income * rng.uniform(0.0, 0.08, n_rows),
+        true_income * rng.uniform(0.0, 0.03, n_rows),
+        true_income * rng.uniform(0.0, 0.04, n_rows),
+        revenue * rng.uniform(0.0, 0.5, n_rows),
+    ])
+    return np.round(raw, 2)
+
+
+def random_features(n_rows, seed=0):
+    """
+    (n_rows, 16) model inputs engineered from uniformly random raw inputs,
+    covering the whole input range rather than realistic filings
+    """
+    rng = np.random.default_rng(seed)
+    return engineer_features(rng.uniform(0, 5000000, size=(n_rows, 8)))
+
+
+def synthetic_filings(n_rows, seed=0, suspicious_share=0.3):
+    """
+    The same filings as JSON-ready /predict records (camelCase fields)
+    """
+    raw = synthetic_raw(n_rows, seed, suspicious_share)
+    return [dict(zip(REQUEST_FIELDS, row)) for row in raw.tolist()]
+
+
+def synthetic_training_frame(n_rows, seed=0, label_noise=0.05, target='potential_tax_fraud'):
+    """
+    Labelled training data in the layout models.train reads: the 16 feature
+    columns plus the target. Filings whose estimated income (from business
+    revenue) exceeds the declared income are labelled fraud, with a share of
+    labels flipped at random.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(engineer_features(synthetic_raw(n_rows, seed)), columns=FEATURE_COLUMNS)
+    label = (df['estimated_income'] > df['income_declared']).to_numpy()
+    flip = np.random.default_rng(seed + 1).random(n_rows) < label_noise
+    df[target] = (label ^ flip).astype(int)
+    return df
@@ -0,0 +1,105 @@
+"""
+Bounded cache of /predict results.
+
+Keys are the canonicalized raw inputs plus the modelType and the artifact
+version(s) that produced the result, so a reloaded model can never serve a
+stale entry; entries for a reloaded model are also dropped eagerly. Scoring is
+deterministic (calibrated probabilities, no random noise), which is what makes
+caching results safe.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def canonical_inputs(row):
+    """
+    Hashable form of one row of raw inputs: floats, with -0.0 folded into 0.0
+    """
+    return tuple(float(value) + 0.0 for value in row)
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a per-entry time to live. A maxsize of 0
+    disables caching.
+    """
+
+    def __init__(self, maxsize=4096, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, value = item
+            if expires <= self.clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model_type=None):
+        """
+        Drop entries that depend on `model_type` (every entry if None)
+        """
+        with self._lock:
+            if model_type is None:
+                dropped = len(self._data)
+                self._data.clear()
+            else:
+                stale = [key for key in self._data if model_type in key[1]]
+                for key in stale:
+                    del self._data[key]
+                dropped = len(stale)
+            self.invalidations += dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+def cache_from_env():
+    return PredictionCache(maxsize=int(os.environ.get('FRAUD_CACHE_SIZE', 4096)),
+                           ttl=float(os.environ.get('FRAUD_CACHE_TTL', 300)))
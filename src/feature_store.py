@@ -0,0 +1,339 @@
+"""
+Columnar on-disk store of engineered features, keyed by taxpayer ID and
+filing year.
+
+    python -m feature_store ingest filings.csv --store feature_store
+    python -m feature_store info --store feature_store
+    python -m feature_store compact --store feature_store
+
+A store is a directory of immutable segments listed in store.json. Each
+segment holds uncompressed .npy columns: taxpayer_id, filing_year, the 16
+FEATURE_COLUMNS as one (n, 16) matrix (raw inputs first) and the label (-1
+when unknown). Segments are mapped read-only with np.load(mmap_mode='r'),
+like model bundles; when a key appears in several segments the newest wins.
+
+Ingesting compares every filing's raw inputs and label with the stored row
+and runs engineer_features only on filings that are new or changed, so
+re-ingesting a mostly unchanged dump costs a lookup instead of a recompute
+and writes a segment with just the changed rows. Rows computed by another
+FEATURES_VERSION count as changed. Once there are MAX_SEGMENTS segments the
+live rows are compacted into one.
+
+models.train accepts a store in place of the training CSV (--data <dir>) and
+models.score can score through one (--feature-store <dir>). One writer at a
+time is assumed; readers always see a complete set of segments because
+store.json is replaced atomically once a segment is written.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, FEATURES_VERSION, RAW_COLUMNS, engineer_features, raw_from_frame
+
+STORE_FORMAT = 'fraud-feature-store'
+STORE_FORMAT_VERSION = 1
+STORE_FILE = 'store.json'
+
+# Key columns as in the training CSV, and the API's camelCase names
+KEY_COLUMNS = ('taxpayer_id', 'filing_year')
+KEY_FIELDS = ('taxpayerId', 'filingYear')
+LABEL_COLUMN = 'potential_tax_fraud'
+UNLABELLED = -1
+
+SEGMENT_ARRAYS = {
+    'taxpayer_id': None,
+    'filing_year': np.int32,
+    'features': np.float64,
+    'label': np.int8,
+}
+MAX_SEGMENTS = 16
+
+N_RAW = len(RAW_COLUMNS)
+
+
+def is_feature_store(path):
+    return os.path.isfile(os.path.join(path, STORE_FILE))
+
+
+def store_digest(path):
+    """
+    Content hash of a store's current state; it changes with every write
+    """
+    with open(os.path.join(path, STORE_FILE), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def keys_from_frame(df):
+    """
+    (taxpayer_ids, filing_years) of a DataFrame with snake_case or camelCase
+    key columns
+    """
+    for id_column, year_column in (KEY_COLUMNS, KEY_FIELDS):
+        if id_column in df.columns and year_column in df.columns:
+            return df[id_column].to_numpy(), df[year_column].to_numpy()
+    raise ValueError(f'Missing key columns: {", ".join(KEY_COLUMNS)}')
+
+
+def _labels(values, n_rows):
+    if values is None:
+        return np.full(n_rows, UNLABELLED, dtype=np.int8)
+    values = np.asarray(values, dtype=np.float64)
+    labels = np.full(n_rows, UNLABELLED, dtype=np.int8)
+    known = ~np.isnan(values)
+    labels[known] = values[known]
+    return labels
+
+
+def _key_index(taxpayer_ids, filing_years):
+    import pandas as pd
+    return pd.MultiIndex.from_arrays([np.asarray(taxpayer_ids).astype(str),
+                                      np.asarray(filing_years, dtype=np.int32)])
+
+
+class FeatureStore:
+    """
+    The store at `path` (created on the first write). Keeps an index of the
+    live rows, mapping each key to its segment and row.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.refresh()
+
+    def refresh(self):
+        """
+        Re-read store.json and map its segments, e.g. after another process
+        wrote to the store
+        """
+        spec_path = os.path.join(self.path, STORE_FILE)
+        if os.path.exists(spec_path):
+            with open(spec_path) as f:
+                spec = json.load(f)
+            if spec.get('format') != STORE_FORMAT or spec.get('format_version') != STORE_FORMAT_VERSION:
+                raise ValueError(f'{spec_path} is not a version {STORE_FORMAT_VERSION} feature store')
+        else:
+            spec = {'format': STORE_FORMAT, 'format_version': STORE_FORMAT_VERSION,
+                    'columns': FEATURE_COLUMNS, 'generation': 0, 'segments': []}
+        self._spec = spec
+        self._segments = [self._open_segment(segment) for segment in spec['segments']]
+
+        if self._segments:
+            segment_numbers = np.concatenate([np.full(len(segment['label']), number, dtype=np.int32)
+                                              for number, segment in enumerate(self._segments)])
+            rows = np.concatenate([np.arange(len(segment['label'])) for segment in self._segments])
+            index = _key_index(np.concatenate([segment['taxpayer_id'] for segment in self._segments]),
+                               np.concatenate([segment['filing_year'] for segment in self._segments]))
+            # Segments are listed oldest first, so the last copy of a key is live
+            live = ~index.duplicated(keep='last')
+            self._index, self._segment, self._row = index[live], segment_numbers[live], rows[live]
+        else:
+            self._index = _key_index([], [])
+            self._segment = np.empty(0, dtype=np.int32)
+            self._row = np.empty(0, dtype=np.intp)
+
+    def _open_segment(self, segment):
+        directory = os.path.join(self.path, segment['name'])
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r', allow_pickle=False)
+                  for name in SEGMENT_ARRAYS}
+        arrays['features_version'] = segment['features_version']
+        return arrays
+
+    def __len__(self):
+        return len(self._index)
+
+    def _gather(self, segment_numbers, rows):
+        """
+        Stored features and labels of the given (segment, row) pairs, and
+        whether each row was computed by the current FEATURES_VERSION
+        """
+        features = np.empty((len(rows), len(FEATURE_COLUMNS)), dtype=np.float64)
+        labels = np.empty(len(rows), dtype=np.int8)
+        current = np.ones(len(rows), dtype=bool)
+        for number in np.unique(segment_numbers):
+            mask = segment_numbers == number
+            segment = self._segments[number]
+            features[mask] = segment['features'][rows[mask]]
+            labels[mask] = segment['label'][rows[mask]]
+            current[mask] = segment['features_version'] == FEATURES_VERSION
+        return features, labels, current
+
+    def _live(self, start=0, stop=None):
+        features, labels, current = self._gather(self._segment[start:stop], self._row[start:stop])
+        if not current.all():
+            features[~current] = engineer_features(features[~current, :N_RAW])
+        return features, labels
+
+    def upsert(self, taxpayer_ids, filing_years, raw, labels=None):
+        """
+        Add or update filings given as keys and an (n, 8) raw input matrix,
+        with optional labels (-1 or NaN where unknown; a stored label is kept
+        when none is given). Only new or changed rows are engineered and
+        written. Returns the (n, 16) features of the given rows and counts
+        of added, changed and unchanged keys.
+        """
+        raw = np.asarray(raw, dtype=np.float64).reshape(-1, N_RAW)
+        keys = _key_index(taxpayer_ids, filing_years)
+        labels = _labels(labels, len(raw))
+        # A key given twice is stored with its last row
+        last = ~keys.duplicated(keep='last')
+
+        position = self._index.get_indexer(keys)
+        found = position >= 0
+        features = np.empty((len(raw), len(FEATURE_COLUMNS)), dtype=np.float64)
+        stored_labels = np.full(len(raw), UNLABELLED, dtype=np.int8)
+        unchanged = np.zeros(len(raw), dtype=bool)
+        if found.any():
+            stored, stored_labels[found], current = self._gather(self._segment[position[found]],
+                                                                 self._row[position[found]])
+            features[found] = stored
+            unchanged[found] = current & np.all(stored[:, :N_RAW] == raw[found], axis=1)
+        labels = np.where(labels == UNLABELLED, stored_labels, labels)
+        unchanged &= labels == stored_labels
+
+        changed = ~unchanged
+        if changed.any():
+            features[changed] = engineer_features(raw[changed])
+        write = changed & last
+        if write.any():
+            self._write_segment(keys[write], features[write], labels[write])
+        stats = {
+            'added': int((~found & last).sum()),
+            'changed': int((found & changed & last).sum()),
+            'unchanged': int((unchanged & last).sum()),
+        }
+        return features, stats
+
+    def upsert_frame(self, df, label_column=LABEL_COLUMN):
+        """
+        upsert() the filings in a DataFrame with key columns, the raw input
+        columns and optionally `label_column`
+        """
+        taxpayer_ids, filing_years = keys_from_frame(df)
+        labels = df[label_column].to_numpy() if label_column in df.columns else None
+        return self.upsert(taxpayer_ids, filing_years, raw_from_frame(df), labels)
+
+    def _write_spec(self, spec):
+        path = os.path.join(self.path, STORE_FILE)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(spec, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def _new_segment(self, keys, features, labels):
+        generation = self._spec['generation'] + 1
+        name = f'segment-{generation:06d}'
+        directory = os.path.join(self.path, name)
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            'taxpayer_id': keys.get_level_values(0).to_numpy().astype(str),
+            'filing_year': keys.get_level_values(1).to_numpy(),
+            'features': features,
+            'label': labels,
+        }
+        for array_name, dtype in SEGMENT_ARRAYS.items():
+            array = np.ascontiguousarray(arrays[array_name], dtype=dtype)
+            np.save(os.path.join(directory, f'{array_name}.npy'), array, allow_pickle=False)
+        return generation, {'name': name, 'rows': len(labels), 'features_version': FEATURES_VERSION}
+
+    def _write_segment(self, keys, features, labels):
+        generation, segment = self._new_segment(keys, features, labels)
+        spec = dict(self._spec, generation=generation, segments=self._spec['segments'] + [segment])
+        self._write_spec(spec)
+        self._spec = spec
+
+        # Point the index at the new rows rather than rebuilding it
+        number = len(self._segments)
+        self._segments.append(self._open_segment(segment))
+        rows = np.arange(len(labels))
+        position = self._index.get_indexer(keys)
+        found = position >= 0
+        self._segment[position[found]] = number
+        self._row[position[found]] = rows[found]
+        self._index = self._index.append(keys[~found])
+        self._segment = np.concatenate([self._segment, np.full((~found).sum(), number, dtype=np.int32)])
+        self._row = np.concatenate([self._row, rows[~found]])
+
+        if len(self._segments) >= MAX_SEGMENTS:
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrite the live rows as a single segment (recomputing rows from an
+        older FEATURES_VERSION) and delete the old segments
+        """
+        if not self._segments:
+            return
+        old = [segment['name'] for segment in self._spec['segments']]
+        features, labels = self._live()
+        generation, segment = self._new_segment(self._index, features, labels)
+        self._write_spec(dict(self._spec, generation=generation, segments=[segment]))
+        # Readers that already mapped the old segments keep their pages
+        for name in old:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+        self.refresh()
+
+    def training_data(self):
+        """
+        (X, y) of every labelled filing
+        """
+        features, labels = self._live()
+        labelled = labels != UNLABELLED
+        return features[labelled], labels[labelled].astype(np.int64)
+
+    def iter_labelled(self, chunk_rows):
+        """
+        training_data() in chunks of at most `chunk_rows` live rows
+        """
+        for start in range(0, len(self), chunk_rows):
+            features, labels = self._live(start, start + chunk_rows)
+            labelled = labels != UNLABELLED
+            yield features[labelled], labels[labelled].astype(np.int64)
+
+    def info(self):
+        labels = self._gather(self._segment, self._row)[1] if len(self) else np.empty(0)
+        return {
+            'path': os.path.abspath(self.path),
+            'rows': len(self),
+            'labelled': int((labels != UNLABELLED).sum()),
+            'segments': len(self._segments),
+            'stored_rows': sum(segment['rows'] for segment in self._spec['segments']),
+            'features_version': FEATURES_VERSION,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain the columnar feature store')
+    parser.add_argument('command', choices=('ingest', 'info', 'compact'))
+    parser.add_argument('inputs', nargs='*', help='CSV or Parquet files of filings to ingest')
+    parser.add_argument('--store', required=True, help='store directory')
+    parser.add_argument('--chunk-rows', type=int, default=100000)
+    parser.add_argument('--label-column', default=LABEL_COLUMN)
+    args = parser.parse_args(argv)
+
+    store = FeatureStore(args.store)
+    if args.command == 'ingest':
+        if not args.inputs:
+            parser.error('ingest needs at least one input file')
+        from models.score import iter_chunks
+
+        totals = {'added': 0, 'changed': 0, 'unchanged': 0}
+        for path in args.inputs:
+            for chunk in iter_chunks(path, args.chunk_rows):
+                _, stats = store.upsert_frame(chunk, args.label_column)
+                for name, count in stats.items():
+                    totals[name] += count
+        print(f"{totals['added']:,} added, {totals['changed']:,} changed, "
+              f"{totals['unchanged']:,} unchanged", file=sys.stderr)
+    elif args.command == 'compact':
+        store.compact()
+    print(json.dumps(store.info(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
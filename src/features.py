@@ -0,0 +1,132 @@
+"""
+Feature engineering shared by the API, batch scoring and training.
+
+All functions work on whole batches: the raw inputs are an (n, 8) matrix and
+every derived column is computed as one NumPy operation over all rows.
+Training recomputes the derived columns from the raw ones too, so a CSV's
+own derived columns are never trusted; feature_store.py persists the result.
+"""
+from operator import itemgetter
+
+import numpy as np
+
+# Request field -> raw column, in model input order
+RAW_FIELDS = [
+    ('incomeDeclared', 'income_declared'),
+    ('businessRevenue', 'business_revenue'),
+    ('livingCost', 'living_cost'),
+    ('luxurySpending', 'luxury_spending'),
+    ('onlineSpending', 'online_spending'),
+    ('propertyTax', 'property_tax'),
+    ('carMaintenance', 'car_maintenance'),
+    ('employeeSalary', 'employee_salary'),
+]
+REQUEST_FIELDS = [field for field, _ in RAW_FIELDS]
+RAW_COLUMNS = [column for _, column in RAW_FIELDS]
+
+DERIVED_COLUMNS = [
+    'expenses', 'income_to_expense_ratio', 'estimated_income',
+    'income_difference', 'total_expenditure', 'spending_to_income_ratio',
+    'high_value_purchase_flag', 'excessive_spending_flag',
+]
+FEATURE_COLUMNS = RAW_COLUMNS + DERIVED_COLUMNS
+
+# Feature names for explanation
+FEATURE_NAMES = [
+    'Income Declared', 'Business Revenue', 'Living Cost', 'Luxury Spending',
+    'Online Spending', 'Property Tax', 'Car Maintenance', 'Employee Salary', 'Total Expenses',
+    'Income to Expense Ratio', 'Estimated Income', 'Income Difference',
+    'Total Expenditure', 'Spending to Income Ratio',
+    'High Value Purchase Flag', 'Excessive Spending Flag'
+]
+
+ESTIMATED_INCOME_RATE = 0.20
+HIGH_VALUE_PURCHASE_LIMIT = 100000
+EXCESSIVE_SPENDING_RATIO = 0.8
+
+# Bump whenever engineer_features changes what it computes: stored features
+# (feature_store.py, the training cache) from another version are recomputed
+FEATURES_VERSION = 1
+
+
+def _safe_divide(numerator, denominator):
+    # x / 0 is defined as 0, matching the original scalar code
+    out = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def engineer_features(raw):
+    """
+    Build the (n, 16) model input matrix from an (n, 8) matrix of raw inputs
+    ordered as RAW_COLUMNS
+    """
+    raw = np.asarray(raw, dtype=np.float64)
+    if raw.ndim == 1:
+        raw = raw.reshape(1, -1)
+    (income_declared, business_revenue, living_cost, luxury_spending,
+     online_spending, property_tax, car_maintenance, employee_salary) = raw.T
+
+    features = np.empty((raw.shape[0], len(FEATURE_COLUMNS)), dtype=np.float64)
+    features[:, :8] = raw
+
+    expenses = living_cost + luxury_spending + online_spending + property_tax + car_maintenance + employee_salary
+    estimated_income = business_revenue * ESTIMATED_INCOME_RATE
+    total_expenditure = living_cost + luxury_spending + online_spending
+    spending_to_income_ratio = _safe_divide(total_expenditure, income_declared)
+
+    features[:, 8] = expenses
+    features[:, 9] = _safe_divide(income_declared, expenses)
+    features[:, 10] = estimated_income
+    features[:, 11] = estimated_income - income_declared
+    features[:, 12] = total_expenditure
+    features[:, 13] = spending_to_income_ratio
+    features[:, 14] = luxury_spending > HIGH_VALUE_PURCHASE_LIMIT
+    features[:, 15] = spending_to_income_ratio > EXCESSIVE_SPENDING_RATIO
+    return features
+
+
+def raw_from_records(records, fields=REQUEST_FIELDS):
+    """
+    Stack request records (dicts keyed by `fields`) into an (n, 8) float
+    matrix. Raises ValueError naming the first bad record; null, NaN and
+    infinite values count as non-numeric.
+    """
+    getter = itemgetter(*fields)
+    try:
+        rows = [getter(record) for record in records]
+    except (KeyError, TypeError):
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise ValueError(f'Record {i} is not an object')
+            for field in fields:
+                if field not in record:
+                    raise ValueError(f'Record {i}: missing field: {field}')
+        raise
+    try:
+        raw = np.array(rows, dtype=np.float64).reshape(len(rows), len(fields))
+    except (TypeError, ValueError):
+        for i, row in enumerate(rows):
+            try:
+                [float(value) for value in row]
+            except (TypeError, ValueError):
+                raise ValueError(f'Record {i}: non-numeric input')
+        raise
+    # None converts to NaN, and 'NaN'/'inf' strings parse
+    finite = np.isfinite(raw).all(axis=1)
+    if not finite.all():
+        raise ValueError(f'Record {int(np.argmin(finite))}: non-numeric input')
+    return raw
+
+
+def raw_from_frame(df):
+    """
+    The (n, 8) raw input matrix of a DataFrame with either the snake_case
+    columns of the training CSV or the API's camelCase field names
+    """
+    if all(column in df.columns for column in RAW_COLUMNS):
+        return df[RAW_COLUMNS].to_numpy(dtype=np.float64)
+    if all(field in df.columns for field in REQUEST_FIELDS):
+        return df[REQUEST_FIELDS].to_numpy(dtype=np.float64)
+    missing = [column for column in RAW_COLUMNS if column not in df.columns]
+    raise ValueError(f'Missing input columns: {", ".join(missing)}')
@@ -0,0 +1,195 @@
+"""
+In-process counters and latency histograms, rendered in the Prometheus text
+format by GET /metrics.
+
+Spans time the stages of a request (parsing, feature engineering, model
+lookup/load, scoring, explanations, serialization) per endpoint and model;
+counters track requests, scored rows and every error path, including the
+random default returned when scoring fails outside deterministic mode.
+
+Values are per process: under serve.py every gunicorn worker keeps its own,
+so scrape the workers individually or aggregate by instance.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; the last bucket (+Inf) is implicit
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels))
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def replace(self, samples):
+        """
+        Make `samples` ((labels, value) pairs) the only series, so series of
+        things that went away (e.g. unloaded models) stop being exported
+        """
+        values = {self._key(labels): value for labels, value in samples}
+        with self._lock:
+            self._values = values
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get(self, **labels):
+        state = self._values.get(self._key(labels))
+        return None if state is None else {'count': state[2], 'sum': state[1]}
+
+    def _samples(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {repr(float(total))}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The set of metrics rendered by GET /metrics
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+REQUEST_SECONDS = metrics.histogram(
+    'fraud_http_request_seconds', 'Time spent handling a request', ('endpoint',))
+REQUESTS = metrics.counter(
+    'fraud_http_requests_total', 'Requests handled, by endpoint and status code', ('endpoint', 'status'))
+STAGE_SECONDS = metrics.histogram(
+    'fraud_stage_seconds', 'Time spent in each stage of a scoring request', ('endpoint', 'stage', 'model'))
+ROWS_SCORED = metrics.counter(
+    'fraud_rows_scored_total', 'Rows scored, by endpoint and model', ('endpoint', 'model'))
+ERRORS = metrics.counter(
+    'fraud_errors_total', 'Errors, by where they were handled', ('path', 'model'))
+# Set from registry/cache/batcher state whenever /metrics is rendered
+MODEL_LOAD_SECONDS = metrics.gauge(
+    'fraud_model_load_seconds', 'Load time of each loaded model artifact', ('model', 'format'))
+MODEL_INFO = metrics.gauge(
+    'fraud_model_info', 'Version of each loaded model (always 1)', ('model', 'version', 'format'))
+CACHE_STATS = metrics.gauge('fraud_cache', 'Prediction cache size and counters', ('stat',))
+BATCHER_STATS = metrics.gauge('fraud_microbatch', 'Micro-batcher queue depth and counters', ('stat',))
+
+
+def span(endpoint, stage, model=''):
+    """
+    Time one stage of a request: `with span('predict', 'features'): ...`
+    """
+    return STAGE_SECONDS.time(endpoint=endpoint, stage=stage, model=model or '')
+
+
+def count_error(path, model=''):
+    ERRORS.inc(path=path, model=model or '')
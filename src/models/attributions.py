@@ -0,0 +1,50 @@
+"""
+Per-return attributions for tree models.
+
+Each row's fraud probability is decomposed into a bias (the forest's average
+root probability) plus one contribution per feature, by following the row's
+decision path through every tree (see FlatForest.contributions). This is the
+path-based approximation of TreeSHAP: O(depth) per tree and row, and the
+contributions add up exactly to the model's probability.
+"""
+import numpy as np
+
+from features import FEATURE_NAMES
+from models.explain import TOP_FACTORS
+
+
+def tree_attributions(entry, X):
+    """
+    (bias, contributions) for the unscaled feature matrix X. The registry's
+    forest has the scaler folded in, so no transform is needed.
+    """
+    return entry.forest.contributions(X)
+
+
+def local_top_factors(entry, X, top_k=TOP_FACTORS, feature_names=FEATURE_NAMES):
+    """
+    Top contributing factors for every row of X ranked by the size of that
+    row's own contributions. Importance is the feature's share of the row's
+    total absolute contribution; direction says whether it raised or lowered
+    the fraud probability.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    _, contributions = tree_attributions(entry, X)
+    magnitude = np.abs(contributions)
+    totals = magnitude.sum(axis=1, keepdims=True)
+    share = np.divide(magnitude, totals, out=np.zeros_like(magnitude), where=totals > 0)
+
+    columns = np.argsort(-magnitude, axis=1, kind='stable')[:, :top_k]
+    share = np.take_along_axis(share, columns, axis=1).tolist()
+    values = np.take_along_axis(X, columns, axis=1).tolist()
+    signed = np.take_along_axis(contributions, columns, axis=1).tolist()
+
+    return [
+        [{'feature': feature_names[column],
+          'importance': imp,
+          'value': value,
+          'contribution': contribution,
+          'direction': 'positive' if contribution > 0 else 'negative'}
+         for column, imp, value, contribution in zip(row_columns, row_share, row_values, row_signed)]
+        for row_columns, row_share, row_values, row_signed in zip(columns.tolist(), share, values, signed)
+    ]
@@ -0,0 +1,238 @@
+"""
+Memory-mapped model bundles.
+
+A bundle is a directory of uncompressed .npy arrays plus a small JSON
+description (bundle.json) holding everything the service needs to score and
+explain with one model: the scaler-folded linear weights or flat forest node
+arrays, the scaler's mean and scale, the explanation importances and the
+calibrator parameters.
+
+    python -m models.bundle --model all
+
+exports the artifacts the registry currently serves into
+artifacts/<model_type>/<version>/bundle and points the manifest at them.
+
+Loading maps the arrays read-only with np.load(mmap_mode='r'), so it takes
+milliseconds, needs neither pickle nor sklearn, and every worker process
+shares the same physical pages through the OS page cache.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from models.calibration import IsotonicCalibrator, PlattCalibrator, has_probabilities
+from models.explain import ExplanationTable, build_explanation_table
+from models.forest import FlatForest
+from models.linear import CompiledLinear, is_linear_model
+
+BUNDLE_FORMAT = 'fraud-model-bundle'
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_FILE = 'bundle.json'
+
+# Array dtypes as the scoring code uses them, so mapped arrays are never copied
+FOREST_ARRAYS = {
+    'feature': np.intp,
+    'threshold': np.float64,
+    'left': np.intp,
+    'right': np.intp,
+    'value': np.float64,
+    'roots': np.intp,
+}
+
+
+class ArrayScaler:
+    """
+    StandardScaler.transform from its mean and scale arrays
+    """
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def _scaler_arrays(scaler, n_features):
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    mean = np.zeros(n_features) if mean is None else mean
+    scale = np.ones(n_features) if scale is None else scale
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+def _calibrator_spec(calibrator, arrays):
+    if calibrator is None:
+        return None
+    if calibrator.method == 'platt':
+        return {'method': 'platt', 'a': calibrator.a, 'b': calibrator.b}
+    if calibrator.method == 'isotonic':
+        arrays['calibrator_x'] = calibrator.x_thresholds
+        arrays['calibrator_y'] = calibrator.y_thresholds
+        return {'method': 'isotonic'}
+    raise ValueError(f'Cannot export calibrator: {calibrator.method}')
+
+
+def export_bundle(model, scaler, out_dir, model_type, version, calibrator=None):
+    """
+    Write the bundle for a fitted model/scaler pair to out_dir and return the
+    path of its bundle.json. Linear models and decision trees/forests are
+    supported; anything else raises ValueError.
+    """
+    n_features = int(model.n_features_in_)
+    mean, scale = _scaler_arrays(scaler, n_features)
+    explanation = build_explanation_table(model)
+    arrays = {
+        'scaler_mean': mean,
+        'scaler_scale': scale,
+        'importance': explanation.importance,
+    }
+    if explanation.coefficients is not None:
+        arrays['coefficients'] = explanation.coefficients
+
+    spec = {
+        'format': BUNDLE_FORMAT,
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'model_type': model_type,
+        'model_class': type(model).__name__,
+        'version': version,
+        'n_features': n_features,
+        'probabilistic': has_probabilities(model),
+        'calibrator': _calibrator_spec(calibrator, arrays),
+    }
+    if is_linear_model(model):
+        linear = CompiledLinear.from_model(model, scaler, np.float64)
+        arrays['weights'] = linear.weights
+        spec['kind'] = 'linear'
+        spec['bias'] = float(linear.bias)
+    elif hasattr(model, 'tree_') or hasattr(model, 'estimators_'):
+        forest = FlatForest.from_model(model).fold_scaler(scaler)
+        for name, dtype in FOREST_ARRAYS.items():
+            arrays[name] = np.asarray(getattr(forest, name), dtype=dtype)
+        spec['kind'] = 'forest'
+    else:
+        raise ValueError(f'Cannot export {type(model).__name__}: only linear and tree models are supported')
+
+    os.makedirs(out_dir, exist_ok=True)
+    spec['arrays'] = {}
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        filename = f'{name}.npy'
+        np.save(os.path.join(out_dir, filename), array, allow_pickle=False)
+        spec['arrays'][name] = filename
+        digest.update(name.encode())
+        digest.update(array.tobytes())
+    spec['arrays_sha256'] = digest.hexdigest()
+
+    # bundle.json goes last, atomically, so a reader never sees a partial bundle
+    path = os.path.join(out_dir, BUNDLE_FILE)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(spec, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_bundle_spec(path):
+    with open(path) as f:
+        spec = json.load(f)
+    if spec.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f'{path} is not a model bundle')
+    if spec.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version {spec.get('format_version')} in {path}")
+    return spec
+
+
+def load_bundle(path, linear_dtype=np.float64):
+    """
+    Map a bundle's arrays read-only and rebuild the compiled scoring objects
+    on top of them. `path` is the bundle.json file. Returns a dict with the
+    spec, scaler, calibrator, explanation, forest or linear, and size_bytes
+    (the total size of the mapped arrays).
+    """
+    spec = read_bundle_spec(path)
+    directory = os.path.dirname(path)
+    arrays = {name: np.load(os.path.join(directory, filename), mmap_mode='r', allow_pickle=False)
+              for name, filename in spec['arrays'].items()}
+
+    calibrator = None
+    calibration = spec.get('calibrator')
+    if calibration is not None:
+        if calibration['method'] == 'platt':
+            calibrator = PlattCalibrator(calibration['a'], calibration['b'])
+        elif calibration['method'] == 'isotonic':
+            calibrator = IsotonicCalibrator(arrays['calibrator_x'], arrays['calibrator_y'])
+        else:
+            raise ValueError(f"Unknown calibration method in {path}: {calibration['method']}")
+
+    forest = linear = None
+    if spec['kind'] == 'linear':
+        linear = CompiledLinear(arrays['weights'], spec['bias'], spec['probabilistic'], linear_dtype)
+    elif spec['kind'] == 'forest':
+        forest = FlatForest(*(arrays[name] for name in FOREST_ARRAYS), spec['n_features'], np.float64)
+    else:
+        raise ValueError(f"Unknown bundle kind in {path}: {spec['kind']}")
+
+    return {
+        'spec': spec,
+        'scaler': ArrayScaler(arrays['scaler_mean'], arrays['scaler_scale']),
+        'calibrator': calibrator,
+        'explanation': ExplanationTable(arrays['importance'], arrays.get('coefficients')),
+        'forest': forest,
+        'linear': linear,
+        'size_bytes': sum(array.nbytes for array in arrays.values()),
+    }
+
+
+def export_current(model_type, registry):
+    """
+    Export the pickled artifact `registry` resolves for model_type next to its
+    manifest version (or under its content hash for the legacy files) and
+    point the manifest at the bundle
+    """
+    from models.registry import read_manifest, write_manifest_entry
+
+    entry = registry.get(model_type)
+    out_dir = os.path.join(registry.artifacts_dir, model_type, entry.version, 'bundle')
+    path = export_bundle(entry.model, entry.scaler, out_dir, model_type, entry.version, entry.calibrator)
+
+    manifest_entry = dict(read_manifest(registry.artifacts_dir)['models'].get(model_type) or {
+        'version': entry.version,
+        'model': os.path.relpath(entry.model_path, registry.artifacts_dir),
+        'scaler': os.path.relpath(entry.scaler_path, registry.artifacts_dir),
+        'model_class': type(entry.model).__name__,
+    })
+    manifest_entry['bundle'] = os.path.relpath(path, registry.artifacts_dir)
+    write_manifest_entry(model_type, manifest_entry, registry.artifacts_dir)
+    return path
+
+
+def main(argv=None):
+    from models.registry import ARTIFACTS_DIR, ModelRegistry
+    from models.train import resolve_model_types
+
+    parser = argparse.ArgumentParser(description='Export models as memory-mapped bundles')
+    parser.add_argument('--model', action='append', default=None,
+                        help='lr, rf, dt, svm, a full model type, or all (repeatable)')
+    parser.add_argument('--artifacts-dir', default=ARTIFACTS_DIR)
+    args = parser.parse_args(argv)
+
+    try:
+        model_types = resolve_model_types(args.model or ['all'])
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Read the pickles even where a bundle already exists
+    source = ModelRegistry(artifacts_dir=args.artifacts_dir, use_bundles=False)
+    for model_type in model_types:
+        path = export_current(model_type, source)
+        print(f'{model_type}: {path}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Probability calibration fitted on the held-out split at training time.
+
+A calibrator maps a model's raw score (predict_proba for the fraud class, or
+decision_function for margin models) to a calibrated fraud probability.
+Both kinds only hold a few NumPy arrays so they stay cheap to load.
+"""
+import numpy as np
+
+CALIBRATION_METHODS = ('platt', 'isotonic', 'none')
+
+
+def raw_scores(model, scaled):
+    """
+    One model evaluation per row: the fraud-class probability when the model
+    has predict_proba, otherwise its decision function
+    """
+    if hasattr(model, 'predict_proba'):
+        fraud_index = list(model.classes_).index(1)
+        return model.predict_proba(scaled)[:, fraud_index]
+    return model.decision_function(scaled)
+
+
+def has_probabilities(model):
+    return hasattr(model, 'predict_proba')
+
+
+def sigmoid(values):
+    # exp(-log(1 + exp(-x))) without overflow for large |x|
+    return np.exp(-np.logaddexp(0, -np.asarray(values)))
+
+
+class PlattCalibrator:
+    """
+    p = sigmoid(a * score + b)
+    """
+    method = 'platt'
+
+    def __init__(self, a, b):
+        self.a = float(a)
+        self.b = float(b)
+
+    def __call__(self, scores):
+        return sigmoid(self.a * np.asarray(scores, dtype=np.float64) + self.b)
+
+
+class IsotonicCalibrator:
+    """
+    Piecewise-linear monotone map, clipped to the fitted score range
+    """
+    method = 'isotonic'
+
+    def __init__(self, x_thresholds, y_thresholds):
+        self.x_thresholds = np.asarray(x_thresholds, dtype=np.float64)
+        self.y_thresholds = np.asarray(y_thresholds, dtype=np.float64)
+
+    def __call__(self, scores):
+        return np.interp(np.asarray(scores, dtype=np.float64), self.x_thresholds, self.y_thresholds)
+
+
+def fit_calibrator(method, scores, y):
+    """
+    Fit a calibrator on held-out raw scores and true labels. Returns None
+    for method 'none'.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    y = np.asarray(y)
+    if method == 'none':
+        return None
+    if method == 'platt':
+        from sklearn.linear_model import LogisticRegression
+        lr = LogisticRegression(C=1e6)
+        lr.fit(scores.reshape(-1, 1), y)
+        return PlattCalibrator(lr.coef_[0][0], lr.intercept_[0])
+    if method == 'isotonic':
+        from sklearn.isotonic import IsotonicRegression
+        iso = IsotonicRegression(out_of_bounds='clip', y_min=0.0, y_max=1.0)
+        iso.fit(scores, y)
+        return IsotonicCalibrator(iso.X_thresholds_, iso.y_thresholds_)
+    raise ValueError(f'Unknown calibration method: {method}')
+
+
+def brier_score(probability, y):
+    return float(np.mean((np.asarray(probability, dtype=np.float64) - np.asarray(y)) ** 2))
@@ -0,0 +1,142 @@
+"""
+Score one feature matrix with several models at once.
+
+The feature matrix is built once by the caller. Models whose StandardScalers
+have identical parameters share a single transform (compiled models have the
+scaler folded in and skip it), and the models then run
+concurrently in a small thread pool (sklearn and NumPy release the GIL for
+most of the numeric work).
+"""
+import math
+import numbers
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from models.inference import fraud_probability, label_and_confidence, probability_from_scaled, uses_compiled
+from models.registry import MODEL_TYPES, registry
+
+VOTING_METHODS = ('soft', 'hard')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=len(MODEL_TYPES),
+                                               thread_name_prefix='ensemble')
+    return _executor
+
+
+def scaler_key(scaler):
+    """
+    Key that is equal for scalers that transform identically
+    """
+    parts = [getattr(scaler, 'with_mean', True), getattr(scaler, 'with_std', True)]
+    for name in ('mean_', 'scale_'):
+        value = getattr(scaler, name, None)
+        parts.append(None if value is None else np.asarray(value).tobytes())
+    return tuple(parts)
+
+
+def ensemble_weights(model_types, weights=None):
+    """
+    Weight array for `model_types` from a {model_type: weight} mapping
+    (missing models weigh 1). Raises ValueError for weights of models outside
+    the ensemble and for anything but finite non-negative numbers.
+    """
+    weights = weights or {}
+    extra = [str(name) for name in weights if name not in model_types]
+    if extra:
+        raise ValueError(f'Weights given for models not in the ensemble: {", ".join(extra)}')
+    weight = []
+    for name in model_types:
+        value = weights.get(name, 1.0)
+        if (isinstance(value, bool) or not isinstance(value, numbers.Real)
+                or not math.isfinite(value) or value < 0):
+            raise ValueError(f'Weight for {name} must be a finite non-negative number')
+        weight.append(float(value))
+    weight = np.array(weight)
+    if weight.sum() <= 0:
+        raise ValueError('Ensemble weights must not all be zero')
+    return weight
+
+
+def _timed_probability(entry, X, scaled):
+    start = time.perf_counter()
+    if scaled is None:
+        probability = fraud_probability(entry, X)
+    else:
+        probability = probability_from_scaled(entry, scaled)
+    return probability, time.perf_counter() - start
+
+
+def score_ensemble(X, model_types=MODEL_TYPES, weights=None, voting='soft'):
+    """
+    Score the unscaled feature matrix X with every model in `model_types`.
+
+    `weights` maps model type to a finite non-negative weight (default:
+    equal).
+    Soft voting averages fraud probabilities; hard voting takes the weighted
+    share of models that flag a row. Returns a dict with the combined
+    'probability', 'predictions' and 'confidence' arrays, per-model 'models'
+    results, 'timings' in seconds and the number of 'distinct_scalers' used.
+    """
+    if voting not in VOTING_METHODS:
+        raise ValueError(f'Unknown voting method: {voting}')
+    model_types = list(model_types)
+    unknown = [str(name) for name in model_types if not isinstance(name, str) or name not in MODEL_TYPES]
+    if unknown or not model_types:
+        raise ValueError(f'Unknown ensemble models: {", ".join(unknown) or "none given"}')
+    weight = ensemble_weights(model_types, weights)
+
+    entries = {name: registry.get(name) for name in model_types}
+    timings = {}
+
+    # One transform per distinct scaler; compiled models need none
+    start = time.perf_counter()
+    scaled_by_key = {}
+    scaled = {}
+    for name, entry in entries.items():
+        if uses_compiled(entry, len(X)):
+            scaled[name] = None
+            continue
+        key = scaler_key(entry.scaler)
+        if key not in scaled_by_key:
+            scaled_by_key[key] = entry.scaler.transform(X)
+        scaled[name] = scaled_by_key[key]
+    timings['scaling'] = time.perf_counter() - start
+
+    executor = _get_executor()
+    futures = {name: executor.submit(_timed_probability, entries[name], X, scaled[name])
+               for name in model_types}
+
+    models = {}
+    probabilities = []
+    for name in model_types:
+        probability, seconds = futures[name].result()
+        predictions, confidence = label_and_confidence(probability)
+        models[name] = {'probability': probability, 'predictions': predictions,
+                        'confidence': confidence, 'seconds': seconds}
+        timings[name] = seconds
+        probabilities.append(probability)
+
+    stacked = np.vstack(probabilities)
+    if voting == 'hard':
+        stacked = (stacked > 0.5).astype(np.float64)
+    combined = weight @ stacked / weight.sum()
+    predictions, confidence = label_and_confidence(combined)
+    return {
+        'probability': combined,
+        'predictions': predictions,
+        'confidence': confidence,
+        'models': models,
+        'timings': timings,
+        'distinct_scalers': len(scaled_by_key),
+    }
@@ -0,0 +1,113 @@
+"""
+Precomputed explanation tables.
+
+Everything that does not depend on the input row (normalized importances,
+their sort order, and the per-feature direction rules) is computed once when
+a model is loaded. Explaining a batch of rows is then array indexing plus a
+few vectorized comparisons.
+"""
+import numpy as np
+
+from features import FEATURE_NAMES
+
+TOP_FACTORS = 5
+
+# Ranking used for non-linear SVMs, which expose no importances
+FALLBACK_IMPORTANCE = [0.8, 0.7, 0.65, 0.6, 0.55, 0.5, 0.45, 0.4, 0.35, 0.3, 0.25, 0.2, 0.15, 0.1, 0.05, 0.05]
+
+
+def _direction_rule(name):
+    """
+    Return (threshold, inclusive) for the "high"/"low" label of a feature.
+    A threshold of None means "compare against the row's mean value".
+    """
+    name = name.lower()
+    if 'ratio' in name:
+        if 'income_to_expense' in name or 'income to expense' in name:
+            return 1.0, True
+        if 'spending_to_income' in name or 'spending to income' in name:
+            return 0.8, False
+        return 0.5, False
+    if 'difference' in name:
+        return 0.0, False
+    return None, False
+
+
+class ExplanationTable:
+    """
+    Row-independent explanation data for one model
+    """
+
+    def __init__(self, importance, coefficients=None, feature_names=FEATURE_NAMES):
+        self.feature_names = list(feature_names)
+        self.importance = np.asarray(importance, dtype=np.float64)
+        # Stable sort keeps the original feature order among ties
+        self.order = np.argsort(-self.importance, kind='stable')
+        self.coefficients = None if coefficients is None else np.asarray(coefficients, dtype=np.float64)
+
+        rules = [_direction_rule(name) for name in self.feature_names]
+        self.uses_row_mean = np.array([threshold is None for threshold, _ in rules])
+        self.thresholds = np.array([0.0 if threshold is None else threshold for threshold, _ in rules])
+        self.inclusive = np.array([inclusive for _, inclusive in rules])
+
+    @property
+    def is_linear(self):
+        return self.coefficients is not None
+
+    def directions(self, X, columns=None):
+        """
+        Direction labels for `columns` (default: all) of every row of the
+        unscaled feature matrix X, as an (n, len(columns)) array of strings
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if columns is None:
+            columns = np.arange(X.shape[1])
+        values = X[:, columns]
+
+        if self.is_linear:
+            positive = self.coefficients[columns] * values > 0
+            return np.where(positive, 'positive', 'negative')
+
+        thresholds = np.where(self.uses_row_mean[columns],
+                              X.mean(axis=1, keepdims=True),
+                              self.thresholds[columns])
+        high = np.where(self.inclusive[columns], values >= thresholds, values > thresholds)
+        return np.where(high, 'high', 'low')
+
+    def top_factors(self, X, top_k=TOP_FACTORS):
+        """
+        Top contributing factors for every row of X: one list of dicts per row
+        """
+        X = np.asarray(X, dtype=np.float64)
+        columns = self.order[:top_k]
+        names = [self.feature_names[i] for i in columns]
+        importance = self.importance[columns].tolist()
+        values = X[:, columns].tolist()
+        directions = self.directions(X, columns).tolist()
+        return [
+            [{'feature': name, 'importance': imp, 'value': value, 'direction': direction}
+             for name, imp, value, direction in zip(names, importance, row_values, row_directions)]
+            for row_values, row_directions in zip(values, directions)
+        ]
+
+
+def _normalized(values):
+    values = np.abs(np.asarray(values, dtype=np.float64))
+    total = values.sum()
+    return values / total if total else values
+
+
+def build_explanation_table(model, feature_names=FEATURE_NAMES):
+    """
+    Linear models are ranked by normalized |coefficient| and report the sign of
+    coefficient * value; tree models use feature_importances_ with the domain
+    high/low rules; anything else falls back to a fixed ranking.
+    """
+    n_features = len(feature_names)
+    coefficients = getattr(model, 'coef_', None)
+    if coefficients is not None:
+        coefficients = np.asarray(coefficients, dtype=np.float64).ravel()
+        return ExplanationTable(_normalized(coefficients), coefficients, feature_names)
+    if hasattr(model, 'feature_importances_'):
+        return ExplanationTable(model.feature_importances_, feature_names=feature_names)
+    return ExplanationTable(FALLBACK_IMPORTANCE[:n_features], feature_names=feature_names)
@@ -0,0 +1,218 @@
+"""
+Flat array representation of fitted decision trees and random forests.
+
+All trees are packed into one set of node arrays (global node ids, -1 for a
+leaf's children) so a batch of rows can be pushed through every tree at once,
+one tree level per NumPy step, without per-tree Python calls.
+
+fold_scaler() compiles the StandardScaler into the split thresholds so raw
+feature rows can be evaluated directly. The folded thresholds are found by
+bisection over float64 values so that `x <= folded` holds exactly when
+sklearn's float32((x - mean) / scale) <= threshold does; predictions match
+sklearn bit for bit, not just up to rounding.
+"""
+import numpy as np
+
+# Upper bound on rows * trees pushed through the forest in one step
+MAX_PAIRS_PER_STEP = 1 << 20
+
+_SIGN_MASK = np.int64(0x7FFFFFFFFFFFFFFF)
+
+
+def _ordered_key(x):
+    # Map float64 values to int64 keys with the same ordering (an involution)
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return bits ^ ((bits >> 63) & _SIGN_MASK)
+
+
+def _from_ordered_key(key):
+    return (key ^ ((key >> 63) & _SIGN_MASK)).view(np.float64)
+
+
+def _sklearn_goes_left(x, mean, scale, threshold):
+    # The comparison sklearn makes after StandardScaler.transform
+    return ((x - mean) / scale).astype(np.float32) <= threshold
+
+
+def fold_thresholds(threshold, mean, scale):
+    """
+    For each split, the largest raw float64 x that sklearn sends left
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+    guess = threshold * scale + mean
+    margin = (np.abs(threshold) + 1) * np.abs(scale) * 1e-5 + np.abs(mean) * 1e-12 + 1e-300
+
+    lo = guess - margin
+    hi = guess + margin
+    for _ in range(8):
+        bad_lo = ~_sklearn_goes_left(lo, mean, scale, threshold)
+        bad_hi = _sklearn_goes_left(hi, mean, scale, threshold)
+        if not (bad_lo.any() or bad_hi.any()):
+            break
+        margin = np.where(bad_lo | bad_hi, margin * 16, margin)
+        lo = np.where(bad_lo, guess - margin, lo)
+        hi = np.where(bad_hi, guess + margin, hi)
+    else:
+        raise ValueError('Could not bracket folded tree thresholds')
+
+    lo_key = _ordered_key(lo)
+    hi_key = _ordered_key(hi)
+    while True:
+        open_ = hi_key - lo_key > 1
+        if not open_.any():
+            break
+        mid_key = lo_key + (hi_key - lo_key) // 2
+        left = _sklearn_goes_left(_from_ordered_key(mid_key), mean, scale, threshold)
+        lo_key = np.where(open_ & left, mid_key, lo_key)
+        hi_key = np.where(open_ & ~left, mid_key, hi_key)
+    return _from_ordered_key(lo_key)
+
+
+class FlatForest:
+    """
+    Packed node arrays for one or more trees.
+
+    value[node] is the fraud-class probability at that node, so a forest's
+    predicted probability is the mean of value over the leaves reached.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, n_features,
+                 input_dtype=np.float32):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.n_features = int(n_features)
+        # float32 for sklearn's scaled inputs, float64 once the scaler is folded in
+        self.input_dtype = np.dtype(input_dtype)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Flatten a fitted DecisionTreeClassifier or RandomForestClassifier
+        """
+        estimators = getattr(model, 'estimators_', None) or [model]
+        fraud_index = list(model.classes_).index(1)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1)
+            leaf = tree.children_left == -1
+
+            roots.append(offset)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(leaf, -1, tree.children_left + offset))
+            rights.append(np.where(leaf, -1, tree.children_right + offset))
+            values.append(counts[:, fraud_index] / np.where(totals == 0, 1, totals))
+            offset += tree.node_count
+
+        return cls(np.concatenate(features), np.concatenate(thresholds),
+                   np.concatenate(lefts), np.concatenate(rights),
+                   np.concatenate(values), roots, model.n_features_in_)
+
+    def fold_scaler(self, scaler):
+        """
+        Return a copy that takes raw (unscaled) rows by compiling the
+        StandardScaler's mean and scale into every split threshold
+        """
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        mean = np.zeros(self.n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones(self.n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        internal = self.left >= 0
+        threshold = self.threshold.copy()
+        features = self.feature[internal]
+        threshold[internal] = fold_thresholds(self.threshold[internal], mean[features], scale[features])
+        return FlatForest(self.feature, threshold, self.left, self.right, self.value,
+                          self.roots, self.n_features, np.float64)
+
+    def _prepare(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X
+
+    def leaves(self, X):
+        """
+        Leaf reached in every tree for every row: an (n_rows, n_trees) array
+        """
+        X = self._prepare(X)
+        n_rows = X.shape[0]
+        node = np.tile(self.roots, n_rows)
+        rows = np.repeat(np.arange(n_rows), self.n_trees)
+        active = np.arange(node.size)
+
+        while active.size:
+            current = node[active]
+            left = self.left[current]
+            internal = left >= 0
+            active, current, left = active[internal], current[internal], left[internal]
+            if not active.size:
+                break
+            go_left = X[rows[active], self.feature[current]] <= self.threshold[current]
+            node[active] = np.where(go_left, left, self.right[current])
+
+        return node.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        """
+        Fraud-class probability for every row, averaged over trees. Tree
+        probabilities are summed in estimator order, as sklearn does.
+        """
+        X = self._prepare(X)
+        step = max(1, MAX_PAIRS_PER_STEP // self.n_trees)
+        probability = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], step):
+            leaves = self.leaves(X[start:start + step])
+            probability[start:start + step] = self.value[leaves.T].sum(axis=0) / self.n_trees
+        return probability
+
+    def contributions(self, X):
+        """
+        Per-row, per-feature local contributions by decision-path attribution.
+
+        Walking each row down each tree, the change in fraud probability at
+        every split is credited to the split's feature. Returns (bias,
+        contributions) where bias is the forest's mean root probability and
+        bias + contributions.sum(axis=1) equals predict_proba(X).
+        """
+        X = self._prepare(X)
+        n_rows = X.shape[0]
+        flat = X.ravel()
+        node = np.tile(self.roots, n_rows)
+        rows = np.repeat(np.arange(n_rows), self.n_trees)
+        totals = np.zeros(n_rows * self.n_features, dtype=np.float64)
+
+        while rows.size:
+            left = self.left[node]
+            internal = left >= 0
+            rows, node, left = rows[internal], node[internal], left[internal]
+            if not rows.size:
+                break
+            cell = rows * self.n_features + self.feature[node]
+            go_left = flat[cell] <= self.threshold[node]
+            child = np.where(go_left, left, self.right[node])
+            totals += np.bincount(cell, weights=self.value[child] - self.value[node],
+                                  minlength=totals.size)
+            node = child
+
+        bias = float(self.value[self.roots].mean())
+        return bias, totals.reshape(n_rows, self.n_features) / self.n_trees
@@ -0,0 +1,96 @@
+"""
+Vectorized scoring of engineered feature matrices with a loaded model
+"""
+import numpy as np
+
+from models.calibration import raw_scores, sigmoid
+from models.registry import registry
+
+# Rows per scaler/model call; bounds the temporary arrays sklearn allocates
+BATCH_CHUNK_SIZE = 10000
+
+# Flat forest evaluation beats sklearn's per-tree dispatch for small batches
+# but does more memory traffic per node visit, so above this many
+# rows * nodes the sklearn path is used (about 600 rows for the bundled forest).
+# Forests loaded from a memory-mapped bundle have no sklearn estimator and use
+# the flat forest for every batch size.
+COMPILED_FOREST_MAX_WORK = 10000000
+
+
+def uses_compiled(entry, n_rows):
+    """
+    Whether fraud_probability scores these rows without the scaler. Models
+    loaded from a bundle have no sklearn estimator to fall back to.
+    """
+    if entry.linear is not None:
+        return True
+    if entry.forest is None:
+        return False
+    return entry.model is None or n_rows * entry.forest.n_nodes <= COMPILED_FOREST_MAX_WORK
+
+
+def fraud_probability(entry, X):
+    """
+    Calibrated probability of the fraud class for every row of the unscaled
+    (n, 16) feature matrix, from one transform and one model evaluation.
+    Linear models skip both and use their compiled X @ w + b form; tree
+    models use the scaler-folded flat forest for small batches.
+    """
+    if entry.linear is not None:
+        return calibrate(entry, entry.linear.raw_scores(X))
+    if uses_compiled(entry, len(X)):
+        return calibrate(entry, entry.forest.predict_proba(X))
+    return probability_from_scaled(entry, entry.scaler.transform(X))
+
+
+def probability_from_scaled(entry, scaled):
+    """
+    Calibrated fraud probability for rows already transformed by entry.scaler
+    """
+    return calibrate(entry, raw_scores(entry.model, scaled))
+
+
+def calibrate(entry, scores):
+    if entry.calibrator is not None:
+        return entry.calibrator(scores)
+    if entry.probabilistic:
+        return scores
+    # Uncalibrated margin model, e.g. a legacy SVC artifact
+    return sigmoid(scores)
+
+
+def predict_labels(entry, X):
+    """
+    Uncalibrated class labels for the unscaled feature matrix, as the
+    model's own predict() would give them
+    """
+    if entry.linear is not None:
+        return (entry.linear.decision_function(X) > 0).astype(np.int64)
+    if uses_compiled(entry, len(X)):
+        return (entry.forest.predict_proba(X) > 0.5).astype(np.int64)
+    return entry.model.predict(entry.scaler.transform(X))
+
+
+def score_matrix(entry, X, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Return (predictions, confidence) arrays for the feature matrix. The
+    confidence is the probability of the predicted class.
+    """
+    probability = np.empty(X.shape[0], dtype=np.float64)
+    for start in range(0, X.shape[0], chunk_size):
+        stop = start + chunk_size
+        probability[start:stop] = fraud_probability(entry, X[start:stop])
+    return label_and_confidence(probability)
+
+
+def label_and_confidence(probability):
+    """
+    Predicted label and the probability of that label
+    """
+    predictions = (probability > 0.5).astype(np.int64)
+    confidence = np.where(predictions == 1, probability, 1 - probability)
+    return predictions, confidence
+
+
+def score(model_type, X, chunk_size=BATCH_CHUNK_SIZE):
+    return score_matrix(registry.get(model_type), X, chunk_size)
@@ -0,0 +1,65 @@
+"""
+Compiled inference for linear models.
+
+Logistic regression and linear SVMs score sigmoid/identity(w . scaled + b),
+where scaled = (x - mean) / scale is the StandardScaler output. Folding the
+scaler into the weights once at load time,
+
+    w' = w / scale
+    b' = b - sum(w * mean / scale)
+
+turns scoring into a single X @ w' + b' on the raw feature matrix, with no
+scaler call and no sklearn input validation.
+"""
+import numpy as np
+
+from models.calibration import sigmoid
+
+
+def is_linear_model(model):
+    coefficients = getattr(model, 'coef_', None)
+    return (coefficients is not None and hasattr(model, 'intercept_')
+            and np.ndim(coefficients) == 2 and coefficients.shape[0] == 1)
+
+
+class CompiledLinear:
+    """
+    Scaler-folded weights and bias for a binary linear classifier.
+
+    raw_scores() matches calibration.raw_scores on the sklearn path: the
+    fraud-class predict_proba for models that have it, otherwise the
+    decision function.
+    """
+
+    def __init__(self, weights, bias, probabilistic, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.weights = np.ascontiguousarray(weights, dtype=self.dtype)
+        self.bias = self.dtype.type(bias)
+        self.probabilistic = bool(probabilistic)
+
+    @classmethod
+    def from_model(cls, model, scaler, dtype=np.float64):
+        coefficients = np.asarray(model.coef_, dtype=np.float64).ravel()
+        intercept = float(np.ravel(model.intercept_)[0])
+        # coef_ scores classes_[1]; flip it if that is not the fraud class
+        if list(model.classes_).index(1) == 0:
+            coefficients, intercept = -coefficients, -intercept
+
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        mean = np.zeros_like(coefficients) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones_like(coefficients) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        weights = coefficients / scale
+        bias = intercept - np.dot(weights, mean)
+        return cls(weights, bias, hasattr(model, 'predict_proba'), dtype)
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X @ self.weights + self.bias
+
+    def raw_scores(self, X):
+        decision = self.decision_function(X)
+        return sigmoid(decision) if self.probabilistic else decision
@@ -0,0 +1,378 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from models.bundle import load_bundle
+from models.calibration import has_probabilities
+from models.explain import build_explanation_table
+from models.forest import FlatForest
+from models.linear import CompiledLinear, is_linear_model
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACTS_DIR = os.path.join(MODELS_DIR, 'artifacts')
+MANIFEST_NAME = 'manifest.json'
+
+# Single source of truth for where each model's artifacts live when no
+# trained version is listed in the manifest. The original training scripts
+# saved `logistic_model.pkl`, not `logistic_regression_model.pkl`.
+MODEL_FILES = {
+    'logistic_regression': ('logistic_model.pkl', 'logistic_scaler.pkl'),
+    'random_forest': ('random_forest_model.pkl', 'random_forest_scaler.pkl'),
+    'decision_tree': ('decision_tree_model.pkl', 'decision_tree_scaler.pkl'),
+    'svm': ('svm_model.pkl', 'svm_scaler.pkl'),
+}
+
+MODEL_TYPES = tuple(MODEL_FILES)
+
+# Precision of the compiled linear fast path; float32 halves memory traffic
+# for large batches at the cost of ~1e-6 relative error
+LINEAR_DTYPE = os.environ.get('FRAUD_LINEAR_DTYPE', 'float64')
+
+# Load memory-mapped bundles (see models/bundle.py) where the manifest lists
+# one; FRAUD_USE_BUNDLES=0 reads the pickles instead
+USE_BUNDLES = os.environ.get('FRAUD_USE_BUNDLES', '1') != '0'
+
+# Seconds between checks for newly published versions (see
+# ModelRegistry.start_watcher); 0 leaves reloading to POST /models/reload
+RELOAD_INTERVAL = float(os.environ.get('FRAUD_RELOAD_INTERVAL', '0'))
+
+# Short names accepted by the command line tools
+ALIASES = {
+    'lr': 'logistic_regression',
+    'rf': 'random_forest',
+    'dt': 'decision_tree',
+    'svm': 'svm',
+}
+
+
+def _files_sha256(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(artifacts_dir=ARTIFACTS_DIR):
+    path = os.path.join(artifacts_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'models': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest_entry(model_type, entry, artifacts_dir=ARTIFACTS_DIR):
+    """
+    Point the manifest at a new artifact version. The file is replaced
+    atomically so readers never see a half-written manifest.
+    """
+    os.makedirs(artifacts_dir, exist_ok=True)
+    manifest = read_manifest(artifacts_dir)
+    manifest['models'][model_type] = entry
+    path = os.path.join(artifacts_dir, MANIFEST_NAME)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _is_tree_model(model):
+    estimators = getattr(model, 'estimators_', None) or [model]
+    return all(hasattr(estimator, 'tree_') for estimator in estimators)
+
+
+def _freeze(estimator):
+    # Loaded estimators are shared between requests, so make their fitted
+    # arrays read-only to catch accidental in-place modification.
+    for value in vars(estimator).values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+
+
+class LoadedModel:
+    """
+    A model/scaler pair loaded from disk, plus bookkeeping about the load.
+
+    Models loaded from a bundle have no sklearn estimator (model is None) and
+    always score through their compiled linear or forest form.
+    """
+
+    def __init__(self, model_type, model, scaler, model_path, scaler_path,
+                 mtime, sha256, load_seconds, size_bytes, version=None,
+                 calibrator=None, explanation=None, forest=None, linear=None,
+                 probabilistic=None, model_class=None, artifact_format='pickle'):
+        self.model_type = model_type
+        self.model = model
+        self.scaler = scaler
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.mtime = mtime
+        self.sha256 = sha256
+        self.load_seconds = load_seconds
+        self.size_bytes = size_bytes
+        # Trained artifacts carry a manifest version; legacy files use their hash
+        self.version = version or sha256[:12]
+        self.calibrator = calibrator
+        self.explanation = explanation
+        # Flattened, scaler-folded node arrays for tree models, used for
+        # low-latency scoring and local attributions
+        self.forest = forest
+        # Scaler-folded weights for linear models, used instead of sklearn
+        self.linear = linear
+        # Whether the model's raw scores are already probabilities
+        self.probabilistic = has_probabilities(model) if probabilistic is None else probabilistic
+        self.model_class = model_class or type(model).__name__
+        self.artifact_format = artifact_format
+
+    def info(self):
+        return {
+            'model_type': self.model_type,
+            'model_class': self.model_class,
+            'model_path': self.model_path,
+            'format': self.artifact_format,
+            'version': self.version,
+            'calibration': self.calibrator.method if self.calibrator is not None else None,
+            'load_seconds': self.load_seconds,
+            'size_bytes': self.size_bytes,
+        }
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of model/scaler pairs.
+
+    Each pair is loaded once, on first use or via preload(), and the same
+    objects are handed to every caller afterwards. Pairs exported as bundles
+    are memory-mapped instead of unpickled. Callers must treat them as
+    read-only. reload_if_changed() re-reads a pair whose files were modified.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, artifacts_dir=ARTIFACTS_DIR, linear_dtype=LINEAR_DTYPE,
+                 use_bundles=USE_BUNDLES):
+        self.models_dir = models_dir
+        self.artifacts_dir = artifacts_dir
+        self.linear_dtype = linear_dtype
+        self.use_bundles = use_bundles
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._reload_listeners = []
+        self._watcher_pid = None
+        self._watcher_stop = None
+        self._watcher_thread = None
+
+    def resolve(self, model_type):
+        """
+        Locate the current artifact, preferring the manifest over the legacy
+        files next to this module. Returns a dict with the model, scaler and
+        calibrator pickle paths, the bundle.json path (None unless the
+        manifest lists a bundle and bundles are enabled) and the version.
+        Legacy artifacts have no calibrator, bundle or version.
+        """
+        if model_type not in MODEL_FILES:
+            raise KeyError(f'Unknown model type: {model_type}')
+        entry = read_manifest(self.artifacts_dir)['models'].get(model_type)
+        if entry:
+            def artifact(key):
+                return os.path.join(self.artifacts_dir, entry[key]) if entry.get(key) else None
+            return {
+                'model': artifact('model'),
+                'scaler': artifact('scaler'),
+                'calibrator': artifact('calibrator'),
+                'bundle': artifact('bundle') if self.use_bundles else None,
+                'version': entry['version'],
+            }
+        model_file, scaler_file = MODEL_FILES[model_type]
+        return {
+            'model': os.path.join(self.models_dir, model_file),
+            'scaler': os.path.join(self.models_dir, scaler_file),
+            'calibrator': None,
+            'bundle': None,
+            'version': None,
+        }
+
+    def paths(self, model_type):
+        """
+        (model_path, scaler_path) of the files a loaded model is read from;
+        a bundle is tracked by its bundle.json alone
+        """
+        artifact = self.resolve(model_type)
+        if artifact['bundle']:
+            return artifact['bundle'], None
+        return artifact['model'], artifact['scaler']
+
+    def _load(self, model_type):
+        artifact = self.resolve(model_type)
+        if artifact['bundle']:
+            return self._load_bundle(model_type, artifact['bundle'], artifact['version'])
+
+        model_path, scaler_path = artifact['model'], artifact['scaler']
+        start = time.perf_counter()
+        mtime = max(os.path.getmtime(model_path), os.path.getmtime(scaler_path))
+        sha256 = _files_sha256(model_path, scaler_path)
+        model = joblib.load(model_path)
+        scaler = joblib.load(scaler_path)
+        calibrator = joblib.load(artifact['calibrator']) if artifact['calibrator'] else None
+        load_seconds = time.perf_counter() - start
+
+        # Size of the artifact files on disk, without serializing the model again
+        size_bytes = sum(os.path.getsize(path) for path in (model_path, scaler_path, artifact['calibrator'])
+                         if path)
+
+        _freeze(model)
+        _freeze(scaler)
+        return LoadedModel(model_type, model, scaler, model_path, scaler_path,
+                           mtime, sha256, load_seconds, size_bytes, artifact['version'], calibrator,
+                           build_explanation_table(model),
+                           FlatForest.from_model(model).fold_scaler(scaler)
+                           if _is_tree_model(model) else None,
+                           CompiledLinear.from_model(model, scaler, self.linear_dtype)
+                           if is_linear_model(model) else None)
+
+    def _load_bundle(self, model_type, path, version):
+        # Bundle directories are immutable once bundle.json is written, so
+        # hashing bundle.json (which records the arrays' hash) is enough
+        start = time.perf_counter()
+        mtime = os.path.getmtime(path)
+        sha256 = _files_sha256(path)
+        bundle = load_bundle(path, self.linear_dtype)
+        load_seconds = time.perf_counter() - start
+        spec = bundle['spec']
+        return LoadedModel(model_type, None, bundle['scaler'], path, None,
+                           mtime, sha256, load_seconds, bundle['size_bytes'],
+                           version or spec['version'], bundle['calibrator'], bundle['explanation'],
+                           bundle['forest'], bundle['linear'], spec['probabilistic'],
+                           spec['model_class'], 'bundle')
+
+    def get(self, model_type):
+        entry = self._entries.get(model_type)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._entries.get(model_type)
+            if entry is None:
+                entry = self._load(model_type)
+                self._entries[model_type] = entry
+        return entry
+
+    def preload(self, model_types=MODEL_TYPES):
+        for model_type in model_types:
+            self.get(model_type)
+
+    def is_loaded(self, model_type):
+        return model_type in self._entries
+
+    def unload(self, model_type=None):
+        """
+        Forget a loaded model (every model if None) so the next get() loads
+        it from disk again, e.g. to measure cold-start latency
+        """
+        with self._lock:
+            if model_type is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(model_type, None)
+
+    def add_reload_listener(self, listener):
+        """
+        Call `listener(model_type)` after a model is reloaded, e.g. to drop
+        cached results computed with the old version
+        """
+        self._reload_listeners.append(listener)
+
+    def reload(self, model_type):
+        entry = self._load(model_type)
+        with self._lock:
+            self._entries[model_type] = entry
+        for listener in self._reload_listeners:
+            listener(model_type)
+        return entry
+
+    def reload_if_changed(self, model_type=None):
+        """
+        Reload every loaded model (or just `model_type`) whose artifact mtime
+        and content hash changed since it was loaded. Returns the reloaded types.
+        """
+        model_types = [model_type] if model_type else list(self._entries)
+        reloaded = []
+        for name in model_types:
+            entry = self._entries.get(name)
+            if entry is None:
+                continue
+            model_path, scaler_path = self.paths(name)
+            if (model_path, scaler_path) != (entry.model_path, entry.scaler_path):
+                # The manifest now points at a different version
+                self.reload(name)
+                reloaded.append(name)
+                continue
+            files = [path for path in (model_path, scaler_path) if path]
+            mtime = max(os.path.getmtime(path) for path in files)
+            if mtime == entry.mtime:
+                continue
+            if _files_sha256(*files) == entry.sha256:
+                # Touched but unchanged
+                entry.mtime = mtime
+                continue
+            self.reload(name)
+            reloaded.append(name)
+        return reloaded
+
+    def start_watcher(self, interval=RELOAD_INTERVAL):
+        """
+        Call reload_if_changed() every `interval` seconds in a daemon thread,
+        so versions published by models.train or models.update are served
+        without a restart. Does nothing if interval is 0 or a watcher already
+        runs in this process. Returns whether one is running; stop_watcher()
+        ends it.
+        """
+        if not interval:
+            return False
+        # Threads don't survive fork, so each gunicorn worker starts its own
+        if self._watcher_pid == os.getpid():
+            return True
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return True
+            self._watcher_stop = threading.Event()
+            self._watcher_thread = threading.Thread(target=self._watch, args=(interval, self._watcher_stop),
+                                                    name='model-reload', daemon=True)
+            self._watcher_thread.start()
+            self._watcher_pid = os.getpid()
+        return True
+
+    def stop_watcher(self, timeout=None):
+        """
+        Stop the watcher started by start_watcher() in this process and wait
+        up to `timeout` seconds for it to exit. Returns whether one was running.
+        """
+        with self._lock:
+            if self._watcher_pid != os.getpid():
+                return False
+            stop, thread = self._watcher_stop, self._watcher_thread
+            self._watcher_pid = self._watcher_stop = self._watcher_thread = None
+        stop.set()
+        thread.join(timeout)
+        return True
+
+    def _watch(self, interval, stop):
+        while not stop.wait(interval):
+            try:
+                reloaded = self.reload_if_changed()
+            except Exception as e:
+                # A half-written or broken artifact: keep serving the loaded
+                # version and try again next time
+                print(f'Model reload failed: {e}')
+                continue
+            for model_type in reloaded:
+                print(f'Reloaded {model_type} version {self._entries[model_type].version}')
+
+    def info(self):
+        return {name: entry.info() for name, entry in self._entries.items()}
+
+
+registry = ModelRegistry()
@@ -0,0 +1,171 @@
+"""
+Offline scoring of large filing dumps.
+
+    python -m models.score filings.csv scored.csv --model rf
+    python -m models.score filings.parquet scored.parquet --model svm --workers 4
+    python -m models.score filings.csv scored.csv --feature-store feature_store
+
+The input is streamed in fixed-size chunks, so memory use does not depend on
+the file size. It needs the eight raw input columns (snake_case as in the
+training CSV, or the API's camelCase names); derived columns are always
+recomputed with features.engineer_features. Parquet support needs pyarrow.
+
+With --feature-store the filings (which then also need taxpayer_id and
+filing_year columns) go through the feature store: only filings that are new
+or changed since they were last stored are engineered, and the store is
+updated for the next run.
+"""
+import argparse
+import collections
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from feature_store import FeatureStore
+from features import engineer_features, raw_from_frame
+from models.inference import score
+from models.registry import ALIASES, MODEL_TYPES
+
+DEFAULT_CHUNK_ROWS = 50000
+
+
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def score_chunk(model_type, df, features=None):
+    """
+    Score one chunk of raw filings, returning it with fraud_detected and
+    confidence columns appended. `features` are engineered from the chunk
+    unless given.
+    """
+    if features is None:
+        features = engineer_features(raw_from_frame(df))
+    predictions, confidence = score(model_type, features)
+    df = df.copy()
+    df['fraud_detected'] = predictions.astype(bool)
+    df['confidence'] = confidence
+    return df
+
+
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self._parquet_writer = None
+        self._first = True
+
+    def write(self, df):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+class Progress:
+    def __init__(self, stream=sys.stderr):
+        self.stream = stream
+        self.rows = 0
+        self.start = time.perf_counter()
+
+    def update(self, rows):
+        self.rows += rows
+        elapsed = time.perf_counter() - self.start
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        print(f'\rscored {self.rows:,} rows ({rate:,.0f} rows/sec)', end='', file=self.stream, flush=True)
+
+    def finish(self):
+        print(file=self.stream)
+
+
+def score_file(input_path, output_path, model_type, chunk_rows=DEFAULT_CHUNK_ROWS,
+               workers=1, progress=None, store=None):
+    """
+    Stream `input_path` through the model into `output_path`. With workers > 1
+    chunks are scored in a process pool; at most 2 * workers chunks are in
+    flight at any time and output order matches input order. With a
+    FeatureStore, features come from (and are written to) the store in this
+    process, which is its only writer.
+    """
+    progress = progress or Progress()
+    writer = ChunkWriter(output_path)
+    stored = collections.Counter()
+
+    def features(chunk):
+        if store is None:
+            return None
+        chunk_features, stats = store.upsert_frame(chunk)
+        stored.update(stats)
+        return chunk_features
+
+    try:
+        if workers <= 1:
+            for chunk in iter_chunks(input_path, chunk_rows):
+                writer.write(score_chunk(model_type, chunk, features(chunk)))
+                progress.update(len(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = collections.deque()
+                for chunk in iter_chunks(input_path, chunk_rows):
+                    pending.append(pool.submit(score_chunk, model_type, chunk, features(chunk)))
+                    if len(pending) >= 2 * workers:
+                        scored = pending.popleft().result()
+                        writer.write(scored)
+                        progress.update(len(scored))
+                while pending:
+                    scored = pending.popleft().result()
+                    writer.write(scored)
+                    progress.update(len(scored))
+    finally:
+        writer.close()
+        progress.finish()
+    if store is not None:
+        print(f"feature store: {stored['added']:,} added, {stored['changed']:,} changed, "
+              f"{stored['unchanged']:,} reused", file=progress.stream)
+    return progress.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a CSV or Parquet file of filings')
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--model', default='random_forest', help='lr, rf, dt, svm or a full model type')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=1, help='processes to score chunks in')
+    parser.add_argument('--feature-store', help='read and update engineered features in this store')
+    args = parser.parse_args(argv)
+
+    model_type = ALIASES.get(args.model, args.model)
+    if model_type not in MODEL_TYPES:
+        parser.error(f'Unknown model type: {args.model}')
+
+    start = time.perf_counter()
+    store = FeatureStore(args.feature_store) if args.feature_store else None
+    rows = score_file(args.input, args.output, model_type, args.chunk_rows, args.workers, store=store)
+    elapsed = time.perf_counter() - start
+    print(f'{rows:,} rows in {elapsed:.1f}s -> {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
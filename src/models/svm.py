@@ -1,40 +1,40 @@
-import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.svm import SVC
-from sklearn.preprocessing import StandardScaler
-from imblearn.over_sampling import SMOTE
-import joblib
 
-# Prepare the data
-df = pd.read_csv("income_tax_fraud_detection_data.csv")
-X = df.drop(columns=['potential_tax_fraud'])
-y = df['potential_tax_fraud']
+from models.inference import predict_labels
+from models.registry import registry
 
-# Split the data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=30)
 
-# Apply SMOTE
-smote = SMOTE(random_state=42)
-X_train_resampled, y_train_resampled = smote.fit_resample(X_train, y_train)
+# Model definition; fitting happens in models/train.py
+def build_svm():
+    from sklearn.svm import SVC
+    return SVC(kernel='linear', random_state=42)
 
-# Standardize features
-scaler = StandardScaler()
-X_train_resampled = scaler.fit_transform(X_train_resampled)
-X_test = scaler.transform(X_test)
+# The kernel SVC solver scales quadratically or worse with the number of rows
+# and keeps every support vector. These train the same linear decision
+# function in the primal and keep only the weights.
+def build_linear_svm():
+    from sklearn.svm import LinearSVC
+    return LinearSVC(C=1.0, dual=False, random_state=42)
 
-# Train the model
-svm_model = SVC(kernel='linear', random_state=42)
-svm_model.fit(X_train_resampled, y_train_resampled)
+def build_sgd_svm(class_weight=None):
+    from sklearn.linear_model import SGDClassifier
+    return SGDClassifier(loss='hinge', alpha=1e-4, average=True, class_weight=class_weight,
+                         random_state=42)
 
-# Save the model
-joblib.dump(svm_model, 'svm_model.pkl')
-joblib.dump(scaler, 'svm_scaler.pkl')
+# --svm-solver choices of models.train
+SVM_BUILDERS = {
+    'svc': build_svm,
+    'linear': build_linear_svm,
+    'sgd': build_sgd_svm,
+}
 
 # Make predictions function
 def predict_svm(input_data):
-    scaler = joblib.load('svm_scaler.pkl')
-    model = joblib.load('svm_model.pkl')
-    input_data = scaler.transform(input_data)  # Preprocess input
-    prediction=model.predict(input_data)
-    return prediction[0]
\ No newline at end of file
+    entry = registry.get('svm')
+    prediction = predict_labels(entry, np.asarray(input_data, dtype=np.float64))
+    return prediction[0]
+
+
+if __name__ == '__main__':
+    from models.train import main
+    main(['--model', 'svm'])
@@ -0,0 +1,520 @@
+"""
+Offline training pipeline.
+
+    python -m models.train --model rf --data income_tax_fraud_detection_data.csv
+    python -m models.train --model all --workers 4
+    python -m models.train --model all --search random --search-iter 20
+    python -m models.train --model svm --svm-solver sgd --chunk-rows 100000
+
+The CSV (or a feature store directory, see feature_store.py) is loaded,
+split, oversampled with SMOTE and standardized once per run, and the result
+is cached on disk under a key made from the data's hash and the
+preprocessing settings, so re-training on unchanged data skips it. Derived
+feature columns are always recomputed from the raw inputs with
+features.engineer_features, exactly as the API computes them.
+The model families are then fitted in parallel worker processes, optionally
+after a grid or random hyperparameter search. --svm-solver sgd trains the
+SVM out of core instead, streaming the CSV in chunks.
+
+Each run writes a new versioned artifact directory under models/artifacts/
+(pickles plus a memory-mapped bundle, see models/bundle.py) and points
+manifest.json at it. The inference side only reads the manifest,
+so importing the app never trains anything.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+from feature_store import FeatureStore, is_feature_store, store_digest
+from features import FEATURES_VERSION, engineer_features, raw_from_frame
+from models.bundle import export_bundle
+from models.calibration import (CALIBRATION_METHODS, brier_score, fit_calibrator, has_probabilities,
+                                raw_scores, sigmoid)
+from models.decision_tree import build_decision_tree
+from models.logistic_regression import build_logistic_regression
+from models.random_forest import build_random_forest
+from models.registry import ALIASES, ARTIFACTS_DIR, MODEL_TYPES, write_manifest_entry
+from models.svm import SVM_BUILDERS, build_svm
+
+DEFAULT_DATA = 'income_tax_fraud_detection_data.csv'
+TARGET = 'potential_tax_fraud'
+
+# Part of the prepared-data cache key: changing any of these re-prepares
+PREPROCESSING = {'test_size': 0.2, 'split_random_state': 30, 'smote_random_state': 42, 'format': 1,
+                 'features_version': FEATURES_VERSION}
+PREPARED_CACHE_DIR = os.path.join(ARTIFACTS_DIR, 'cache')
+
+SEARCH_METHODS = ('none', 'grid', 'random')
+
+# Out-of-core SVM training (--svm-solver sgd)
+STREAM_CHUNK_ROWS = 100000
+STREAM_EPOCHS = 5
+# Held-out rows kept in memory for calibration and metrics
+STREAM_MAX_TEST_ROWS = 200000
+
+# Hyperparameter spaces for --search; random search samples from the same grids
+SEARCH_SPACES = {
+    # l1_ratio 0/1 is the l2/l1 penalty under liblinear; elastic-net needs saga
+    'logistic_regression': [
+        {'C': [0.01, 0.1, 0.5, 1.0, 10.0], 'l1_ratio': [0.0, 1.0]},
+        {'C': [0.01, 0.1, 0.5, 1.0, 10.0], 'l1_ratio': [0.5], 'solver': ['saga'], 'max_iter': [5000]},
+    ],
+    'random_forest': {'n_estimators': [100, 200, 400], 'max_depth': [None, 10, 20],
+                      'min_samples_leaf': [1, 2, 5], 'max_features': ['sqrt', 0.5]},
+    'decision_tree': {'max_depth': [None, 5, 10, 20], 'min_samples_leaf': [1, 5, 20],
+                      'criterion': ['gini', 'entropy']},
+    'svm': {'C': [0.1, 1.0, 10.0]},
+}
+
+BUILDERS = {
+    'logistic_regression': build_logistic_regression,
+    'random_forest': build_random_forest,
+    'decision_tree': build_decision_tree,
+    'svm': build_svm,
+}
+
+
+def resolve_model_types(names):
+    model_types = []
+    for name in names:
+        if name == 'all':
+            return list(MODEL_TYPES)
+        name = ALIASES.get(name, name)
+        if name not in BUILDERS:
+            raise ValueError(f'Unknown model type: {name}')
+        if name not in model_types:
+            model_types.append(name)
+    return model_types
+
+
+def data_sha256(path):
+    if is_feature_store(path):
+        return store_digest(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_training_data(data_path):
+    """
+    (X, y) of a training CSV or of the labelled rows of a feature store
+    """
+    if is_feature_store(data_path):
+        return FeatureStore(data_path).training_data()
+    import pandas as pd
+
+    df = pd.read_csv(data_path)
+    return engineer_features(raw_from_frame(df)), df[TARGET].to_numpy()
+
+
+def prepare_data(data_path):
+    """
+    Load the data, split it, oversample the training side with SMOTE and
+    standardize. Returns the fitted scaler and the scaled splits.
+    """
+    from imblearn.over_sampling import SMOTE
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X, y = read_training_data(data_path)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=PREPROCESSING['test_size'], random_state=PREPROCESSING['split_random_state'])
+
+    smote = SMOTE(random_state=PREPROCESSING['smote_random_state'])
+    X_train_resampled, y_train_resampled = smote.fit_resample(X_train, y_train)
+
+    scaler = StandardScaler()
+    X_train_resampled = scaler.fit_transform(X_train_resampled)
+    X_test = scaler.transform(X_test)
+
+    return {
+        'scaler': scaler,
+        'X_train': X_train_resampled,
+        'y_train': y_train_resampled,
+        'X_test': X_test,
+        'y_test': y_test,
+    }
+
+
+def prepared_cache_key(digest):
+    settings = json.dumps(PREPROCESSING, sort_keys=True).encode()
+    return hashlib.sha256(digest.encode() + settings).hexdigest()[:24]
+
+
+def load_prepared(data_path, cache_dir=PREPARED_CACHE_DIR):
+    """
+    prepare_data() backed by an on-disk cache keyed by the data's content hash
+    and the preprocessing settings. Returns (data, data_sha256, cache_hit).
+    A cache_dir of None disables the cache.
+    """
+    digest = data_sha256(data_path)
+    if cache_dir is None:
+        return prepare_data(data_path), digest, False
+    path = os.path.join(cache_dir, f'prepared-{prepared_cache_key(digest)}.joblib')
+    if os.path.exists(path):
+        return joblib.load(path), digest, True
+
+    data = prepare_data(data_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    joblib.dump(data, tmp_path)
+    os.replace(tmp_path, path)
+    return data, digest, False
+
+
+def new_version():
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+
+
+def build_model(model_type, svm_solver='svc'):
+    if model_type == 'svm':
+        return SVM_BUILDERS[svm_solver]()
+    return BUILDERS[model_type]()
+
+
+def search_model(model_type, data, method='random', n_iter=10, scoring='roc_auc', cv=3, n_jobs=1,
+                 svm_solver='svc'):
+    """
+    Hyperparameter search over SEARCH_SPACES[model_type] on the (SMOTE
+    resampled) training split. Returns the best model refitted on the whole
+    training split and a summary. Cross-validation scores on resampled data
+    are optimistic; the held-out metrics written next to the artifact are not.
+    """
+    from sklearn.model_selection import GridSearchCV, RandomizedSearchCV
+
+    estimator = build_model(model_type, svm_solver)
+    space = SEARCH_SPACES[model_type]
+    if method == 'grid':
+        search = GridSearchCV(estimator, space, scoring=scoring, cv=cv, n_jobs=n_jobs)
+    elif method == 'random':
+        search = RandomizedSearchCV(estimator, space, n_iter=n_iter, scoring=scoring, cv=cv,
+                                    n_jobs=n_jobs, random_state=42)
+    else:
+        raise ValueError(f'Unknown search method: {method}')
+
+    start = time.perf_counter()
+    search.fit(data['X_train'], data['y_train'])
+    summary = {
+        'method': method,
+        'scoring': scoring,
+        'cv': cv,
+        'candidates': len(search.cv_results_['params']),
+        'best_params': search.best_params_,
+        'best_score': float(search.best_score_),
+        'search_seconds': time.perf_counter() - start,
+    }
+    return search.best_estimator_, float(search.refit_time_), summary
+
+
+def evaluate(model, calibrator, data):
+    """
+    Held-out metrics (on data['X_test'], data['y_test']) for the probability
+    the service would return: the calibrated fraud probability, thresholded
+    at 0.5
+    """
+    from sklearn.metrics import (accuracy_score, confusion_matrix, f1_score, precision_score,
+                                 recall_score, roc_auc_score)
+
+    scores = raw_scores(model, data['X_test'])
+    if calibrator is not None:
+        probability = calibrator(scores)
+    elif has_probabilities(model):
+        probability = scores
+    else:
+        probability = sigmoid(scores)
+    y = data['y_test']
+    predictions = (probability > 0.5).astype(int)
+    return {
+        'n_test': int(len(y)),
+        'accuracy': float(accuracy_score(y, predictions)),
+        'precision': float(precision_score(y, predictions, zero_division=0)),
+        'recall': float(recall_score(y, predictions, zero_division=0)),
+        'f1': float(f1_score(y, predictions, zero_division=0)),
+        'roc_auc': float(roc_auc_score(y, probability)) if len(set(y)) > 1 else None,
+        'brier': brier_score(probability, y),
+        'confusion_matrix': confusion_matrix(y, predictions, labels=[0, 1]).tolist(),
+    }
+
+
+def train_model(model_type, data, artifacts_dir=ARTIFACTS_DIR, version=None, extra=None,
+                calibration='platt', search=None, publish=True, svm_solver='svc'):
+    """
+    Fit one model on prepared data (after a hyperparameter search if `search`
+    holds search_model() options), calibrate it on the held-out split and
+    write it as a new artifact version with its metrics. The manifest is
+    pointed at it unless publish is False.
+    """
+    started = time.perf_counter()
+
+    search_summary = None
+    if search:
+        model, fit_seconds, search_summary = search_model(model_type, data, svm_solver=svm_solver, **search)
+    else:
+        model = build_model(model_type, svm_solver)
+        start = time.perf_counter()
+        model.fit(data['X_train'], data['y_train'])
+        fit_seconds = time.perf_counter() - start
+
+    return write_artifacts(model_type, model, data['scaler'], data, len(data['y_train']), fit_seconds,
+                           started, artifacts_dir, version, extra, calibration, publish,
+                           search_summary=search_summary)
+
+
+def write_artifacts(model_type, model, scaler, test, n_train, fit_seconds, started,
+                    artifacts_dir=ARTIFACTS_DIR, version=None, extra=None, calibration='platt',
+                    publish=True, search_summary=None, training=None, calibrator=None,
+                    headline_metrics=True):
+    """
+    Calibrate a fitted model on the held-out rows in `test` and write its
+    pickles, bundle, metrics.json and metadata.json as a new version.
+    `training` describes non-default training (e.g. the streaming SVM).
+    A fitted `calibrator` is kept instead of fitting one on `test`. With
+    headline_metrics False the held-out metrics are only recorded as
+    holdout_metrics, for a `test` too small to stand for the version.
+    """
+    version = version or new_version()
+    if calibrator is None:
+        calibrator = fit_calibrator(calibration, raw_scores(model, test['X_test']), test['y_test'])
+
+    out_dir = os.path.join(artifacts_dir, model_type, version)
+    os.makedirs(out_dir, exist_ok=True)
+    model_path = os.path.join(out_dir, 'model.pkl')
+    scaler_path = os.path.join(out_dir, 'scaler.pkl')
+    joblib.dump(model, model_path)
+    joblib.dump(scaler, scaler_path)
+    calibrator_path = None
+    if calibrator is not None:
+        calibrator_path = os.path.join(out_dir, 'calibrator.pkl')
+        joblib.dump(calibrator, calibrator_path)
+
+    try:
+        bundle_path = export_bundle(model, scaler, os.path.join(out_dir, 'bundle'),
+                                    model_type, version, calibrator)
+    except ValueError as e:
+        # The pickles are still published; the registry loads those instead
+        print(f'{model_type}: no bundle ({e})', file=sys.stderr)
+        bundle_path = None
+
+    # Calibrated on the same held-out split, so slightly optimistic
+    metrics = evaluate(model, calibrator, test)
+    train_seconds = time.perf_counter() - started
+    with open(os.path.join(out_dir, 'metrics.json'), 'w') as f:
+        json.dump({'model_type': model_type, 'version': version, 'fit_seconds': fit_seconds,
+                   'train_seconds': train_seconds, 'params': _json_params(model),
+                   'search': search_summary, 'training': training,
+                   'metrics' if headline_metrics else 'holdout_metrics': metrics}, f, indent=2)
+
+    entry = {
+        'version': version,
+        'model': os.path.relpath(model_path, artifacts_dir),
+        'scaler': os.path.relpath(scaler_path, artifacts_dir),
+        'model_class': type(model).__name__,
+        'trained_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'fit_seconds': fit_seconds,
+        'train_seconds': train_seconds,
+        'n_train': int(n_train),
+        'calibration': calibration,
+    }
+    metric_names = ('accuracy', 'precision', 'recall', 'f1', 'roc_auc')
+    if headline_metrics:
+        entry['metrics'] = {name: metrics[name] for name in metric_names}
+    else:
+        entry['holdout_metrics'] = {name: metrics[name] for name in ('n_test',) + metric_names}
+    if search_summary:
+        entry['search'] = {name: search_summary[name] for name in ('method', 'best_params', 'best_score')}
+    if training:
+        entry['training'] = training
+    if bundle_path:
+        entry['bundle'] = os.path.relpath(bundle_path, artifacts_dir)
+    if calibrator_path:
+        entry['calibrator'] = os.path.relpath(calibrator_path, artifacts_dir)
+        if headline_metrics:
+            entry['calibrated_brier'] = metrics['brier']
+    if extra:
+        entry.update(extra)
+    with open(os.path.join(out_dir, 'metadata.json'), 'w') as f:
+        json.dump(entry, f, indent=2)
+
+    if publish:
+        write_manifest_entry(model_type, entry, artifacts_dir)
+    return entry
+
+
+def _stream_chunks(data_path, chunk_rows):
+    """
+    (X, y, test_mask) per chunk of the CSV or feature store. Rows are
+    assigned to the held-out split with a seeded generator, so every pass
+    over the data splits identically.
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(PREPROCESSING['split_random_state'])
+    if is_feature_store(data_path):
+        chunks = FeatureStore(data_path).iter_labelled(chunk_rows)
+    else:
+        chunks = ((engineer_features(raw_from_frame(chunk)), chunk[TARGET].to_numpy())
+                  for chunk in pd.read_csv(data_path, chunksize=chunk_rows))
+    for X, y in chunks:
+        yield X, y, rng.random(len(y)) < PREPROCESSING['test_size']
+
+
+def train_svm_streaming(data_path, artifacts_dir=ARTIFACTS_DIR, version=None, extra=None,
+                        calibration='platt', chunk_rows=STREAM_CHUNK_ROWS, epochs=STREAM_EPOCHS,
+                        publish=True):
+    """
+    Out-of-core linear SVM: hinge-loss SGD trained with partial_fit over
+    chunks of the data, so memory stays bounded by the chunk size. The first
+    pass fits the StandardScaler and counts labels; class weights take the
+    place of SMOTE (which needs the whole training set in memory). Then
+    `epochs` passes of partial_fit follow.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    started = time.perf_counter()
+    scaler = StandardScaler()
+    counts = np.zeros(2, dtype=np.int64)
+    X_tests, y_tests, n_test = [], [], 0
+    for X, y, test in _stream_chunks(data_path, chunk_rows):
+        scaler.partial_fit(X[~test])
+        counts += np.bincount(y[~test], minlength=2)[:2]
+        keep = np.flatnonzero(test)[:max(0, STREAM_MAX_TEST_ROWS - n_test)]
+        X_tests.append(X[keep])
+        y_tests.append(y[keep])
+        n_test += len(keep)
+
+    n_train = int(counts.sum())
+    # 'balanced' weights: n / (2 * count), computed from the first pass
+    class_weight = {label: n_train / (2 * count) for label, count in enumerate(counts.tolist()) if count}
+    model = SVM_BUILDERS['sgd'](class_weight)
+
+    start = time.perf_counter()
+    for _ in range(epochs):
+        for X, y, test in _stream_chunks(data_path, chunk_rows):
+            if (~test).any():
+                model.partial_fit(scaler.transform(X[~test]), y[~test], classes=[0, 1])
+    fit_seconds = time.perf_counter() - start
+
+    test_data = {'X_test': scaler.transform(np.concatenate(X_tests)), 'y_test': np.concatenate(y_tests)}
+    training = {'solver': 'sgd', 'streaming': True, 'chunk_rows': chunk_rows, 'epochs': epochs,
+                'class_weight': {str(label): weight for label, weight in class_weight.items()}}
+    return write_artifacts('svm', model, scaler, test_data, n_train, fit_seconds, started,
+                           artifacts_dir, version, extra, calibration, publish, training=training)
+
+
+def _json_params(model):
+    return {name: value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+            for name, value in model.get_params().items()}
+
+
+def train_all(model_types, data, artifacts_dir=ARTIFACTS_DIR, version=None, extra=None,
+              calibration='platt', search=None, workers=1, svm_solver='svc'):
+    """
+    Train `model_types` on the same prepared data, in `workers` processes.
+    Workers only write their own version directories; the manifest is
+    updated here, one entry at a time, as each model finishes. Returns
+    {model_type: entry}; models that failed are reported and left out.
+    """
+    version = version or new_version()
+    entries = {}
+    if workers <= 1 or len(model_types) == 1:
+        for model_type in model_types:
+            entries[model_type] = train_model(model_type, data, artifacts_dir, version, extra,
+                                              calibration, search, svm_solver=svm_solver)
+        return entries
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {model_type: pool.submit(train_model, model_type, data, artifacts_dir, version,
+                                           extra, calibration, search, False, svm_solver)
+                   for model_type in model_types}
+        for model_type, future in futures.items():
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f'{model_type}: training failed: {e}', file=sys.stderr)
+                continue
+            write_manifest_entry(model_type, entry, artifacts_dir)
+            entries[model_type] = entry
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train fraud detection models')
+    parser.add_argument('--model', action='append', default=None,
+                        help='lr, rf, dt, svm, a full model type, or all (repeatable)')
+    parser.add_argument('--data', default=DEFAULT_DATA, help='training CSV or feature store directory')
+    parser.add_argument('--artifacts-dir', default=ARTIFACTS_DIR)
+    parser.add_argument('--calibration', choices=CALIBRATION_METHODS, default='platt',
+                        help='probability calibration fitted on the held-out split')
+    parser.add_argument('--workers', type=int, default=min(len(MODEL_TYPES), os.cpu_count() or 1),
+                        help='models fitted in parallel')
+    parser.add_argument('--cache-dir', default=None,
+                        help='prepared-data cache (default: <artifacts-dir>/cache)')
+    parser.add_argument('--no-cache', action='store_true', help='always re-prepare the data')
+    parser.add_argument('--search', choices=SEARCH_METHODS, default='none',
+                        help='hyperparameter search before the final fit')
+    parser.add_argument('--search-iter', type=int, default=10, help='candidates per random search')
+    parser.add_argument('--search-scoring', default='roc_auc')
+    parser.add_argument('--search-cv', type=int, default=3)
+    parser.add_argument('--svm-solver', choices=tuple(SVM_BUILDERS), default='svc',
+                        help='svc: kernel SVC (slow on large data); linear: primal LinearSVC; '
+                             'sgd: out-of-core hinge-loss SGD over CSV chunks (not searched)')
+    parser.add_argument('--chunk-rows', type=int, default=STREAM_CHUNK_ROWS,
+                        help='CSV rows per partial_fit call with --svm-solver sgd')
+    parser.add_argument('--epochs', type=int, default=STREAM_EPOCHS,
+                        help='passes over the CSV with --svm-solver sgd')
+    args = parser.parse_args(argv)
+
+    try:
+        model_types = resolve_model_types(args.model or ['all'])
+    except ValueError as e:
+        parser.error(str(e))
+
+    # The streaming SVM reads the CSV itself and needs no prepared data
+    streaming_svm = args.svm_solver == 'sgd' and 'svm' in model_types
+    in_memory = [model_type for model_type in model_types if not (streaming_svm and model_type == 'svm')]
+
+    cache_dir = None if args.no_cache else (args.cache_dir or os.path.join(args.artifacts_dir, 'cache'))
+    data = None
+    if in_memory:
+        start = time.perf_counter()
+        data, digest, cache_hit = load_prepared(args.data, cache_dir)
+        print(f"prepared data: {'cache hit' if cache_hit else 'prepared'} "
+              f'({time.perf_counter() - start:.2f}s)', file=sys.stderr)
+    else:
+        digest = data_sha256(args.data)
+
+    workers = max(1, min(args.workers, len(in_memory) or 1))
+    search = None
+    if args.search != 'none':
+        # Share the cores between the parallel fits and their searches
+        search = {'method': args.search, 'n_iter': args.search_iter, 'scoring': args.search_scoring,
+                  'cv': args.search_cv, 'n_jobs': max(1, (os.cpu_count() or 1) // workers)}
+
+    extra = {'data_path': os.path.abspath(args.data), 'data_sha256': digest}
+    version = new_version()
+    entries = train_all(in_memory, data, args.artifacts_dir, version, extra,
+                        args.calibration, search, workers, args.svm_solver) if in_memory else {}
+    if streaming_svm:
+        entries['svm'] = train_svm_streaming(args.data, args.artifacts_dir, version, extra,
+                                             args.calibration, args.chunk_rows, args.epochs)
+    for model_type, entry in entries.items():
+        metrics = entry['metrics']
+        print(f"{model_type}: version {entry['version']} ({entry['fit_seconds']:.2f}s fit, "
+              f"f1 {metrics['f1']:.3f}, roc_auc {metrics['roc_auc'] or float('nan'):.3f}) "
+              f"-> {entry['model']}", file=sys.stderr)
+    return 0 if len(entries) == len(model_types) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
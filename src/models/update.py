@@ -0,0 +1,206 @@
+"""
+Incremental model updates from newly labelled filings.
+
+    python -m models.update --model lr --data confirmed_cases.csv
+    python -m models.update --model rf --data confirmed_cases.csv --new-trees 20 --max-trees 100
+
+The CSV holds the new cases only: the 8 raw inputs (snake_case or camelCase)
+plus the potential_tax_fraud label; derived columns are always recomputed. The
+model the registry currently serves is updated and published as a new
+version; running servers pick it up through their reload watcher
+(FRAUD_RELOAD_INTERVAL) or POST /models/reload, without a restart. The cost
+depends only on the size of the new batch.
+
+- Linear models (logistic regression, linear SVMs) continue training with
+  SGD from their current weights, so an SVC or LogisticRegression becomes
+  an SGDClassifier with the matching loss. The learning rate is kept small
+  so the weights move towards the new cases without forgetting the history.
+- Random forests grow `new_trees` trees on the new cases and retire the
+  oldest trees beyond `max_trees`.
+- A single decision tree cannot be updated incrementally; retrain it with
+  models.train.
+
+The existing scaler is kept, so scores of updated and previous versions stay
+comparable. A share of the new cases (--holdout) is held out. The calibrator
+is refit on it, and its metrics become the version's headline metrics, only
+when it has at least MIN_HOLDOUT_ROWS rows and MIN_HOLDOUT_CLASS_ROWS of
+each class; otherwise the parent's calibrator is kept (--recalibrate
+overrides this) and the metrics are recorded as holdout_metrics only.
+"""
+import argparse
+import copy
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from features import engineer_features, raw_from_frame
+from models.linear import is_linear_model
+from models.registry import ARTIFACTS_DIR, ModelRegistry
+from models.train import PREPROCESSING, TARGET, new_version, resolve_model_types, write_artifacts
+
+UPDATE_EPOCHS = 5
+UPDATE_LEARNING_RATE = 0.01
+NEW_TREES = 20
+
+# A holdout smaller than this gives wildly overfitted calibrators and
+# meaningless metrics
+MIN_HOLDOUT_ROWS = 100
+MIN_HOLDOUT_CLASS_ROWS = 10
+
+
+def read_labelled(data_path):
+    """
+    (X, y) for a CSV of new labelled cases, with features engineered from the
+    raw inputs
+    """
+    import pandas as pd
+
+    df = pd.read_csv(data_path)
+    if TARGET not in df.columns:
+        raise ValueError(f'Missing label column: {TARGET}')
+    return engineer_features(raw_from_frame(df)), df[TARGET].to_numpy().astype(int)
+
+
+def update_linear(model, X, y, epochs=UPDATE_EPOCHS):
+    """
+    Continue training a binary linear classifier on scaled rows with SGD,
+    starting from its current weights. Returns an SGDClassifier; `model` is
+    left untouched.
+    """
+    from sklearn.linear_model import SGDClassifier
+
+    if isinstance(model, SGDClassifier):
+        updated = copy.deepcopy(model)
+        for _ in range(epochs):
+            updated.partial_fit(X, y)
+        return updated
+
+    if len(np.unique(y)) < 2:
+        raise ValueError('New cases must include both classes to convert the model for updating')
+    loss = 'log_loss' if hasattr(model, 'predict_proba') else 'hinge'
+    updated = SGDClassifier(loss=loss, learning_rate='constant', eta0=UPDATE_LEARNING_RATE,
+                            alpha=1e-4, max_iter=epochs, tol=None, random_state=42)
+    # SGDClassifier scores classes_[1] like the original model, which is
+    # sorted the same way, so its coefficients carry over unchanged
+    updated.fit(X, y, coef_init=np.asarray(model.coef_, dtype=np.float64),
+                intercept_init=np.atleast_1d(np.asarray(model.intercept_, dtype=np.float64)))
+    return updated
+
+
+def update_forest(model, X, y, new_trees=NEW_TREES, max_trees=None, seed=None):
+    """
+    Grow `new_trees` trees on the scaled rows with the forest's own settings
+    and append them, dropping the oldest trees beyond `max_trees` (default:
+    the current number of trees). Returns a new forest; `model` is left
+    untouched.
+    """
+    from sklearn.base import clone
+
+    if len(np.unique(y)) < len(model.classes_):
+        raise ValueError('New cases must include every class to grow trees on them')
+    growth = clone(model).set_params(n_estimators=new_trees, warm_start=False, random_state=seed)
+    growth.fit(X, y)
+
+    max_trees = max_trees or len(model.estimators_)
+    updated = copy.deepcopy(model)
+    updated.estimators_ = (list(model.estimators_) + list(growth.estimators_))[-max_trees:]
+    updated.n_estimators = len(updated.estimators_)
+    return updated
+
+
+def holdout_is_sufficient(y):
+    counts = np.bincount(y, minlength=2)
+    return len(y) >= MIN_HOLDOUT_ROWS and counts.min() >= MIN_HOLDOUT_CLASS_ROWS
+
+
+def update_model(model_type, data_path, artifacts_dir=ARTIFACTS_DIR, holdout=0.2, epochs=UPDATE_EPOCHS,
+                 new_trees=NEW_TREES, max_trees=None, publish=True, recalibrate=None):
+    """
+    Update the currently served `model_type` with the labelled cases in
+    data_path and write the result as a new version (see write_artifacts).
+    `recalibrate` forces (True) or prevents (False) refitting the calibrator
+    on the holdout; by default it is refit only if the holdout is sufficient.
+    """
+    from sklearn.model_selection import train_test_split
+
+    started = time.perf_counter()
+    current = ModelRegistry(artifacts_dir=artifacts_dir, use_bundles=False).get(model_type)
+    X, y = read_labelled(data_path)
+    X = current.scaler.transform(X)
+    stratify = y if np.bincount(y).min() >= 2 else None
+    X_new, X_test, y_new, y_test = train_test_split(
+        X, y, test_size=holdout, random_state=PREPROCESSING['split_random_state'], stratify=stratify)
+
+    start = time.perf_counter()
+    if is_linear_model(current.model):
+        model = update_linear(current.model, X_new, y_new, epochs)
+        update = {'method': 'sgd', 'epochs': epochs}
+    elif hasattr(current.model, 'estimators_'):
+        # Seeded by the parent version so each update grows different trees
+        model = update_forest(current.model, X_new, y_new, new_trees, max_trees,
+                              zlib.crc32(current.version.encode()))
+        update = {'method': 'add_trees', 'new_trees': new_trees, 'n_trees': len(model.estimators_)}
+    else:
+        raise ValueError(f'{type(current.model).__name__} cannot be updated incrementally; '
+                         f'retrain {model_type} with models.train')
+    fit_seconds = time.perf_counter() - start
+
+    sufficient = holdout_is_sufficient(y_test)
+    refit = sufficient if recalibrate is None else recalibrate
+    if refit and len(np.unique(y_test)) < 2:
+        raise ValueError('The holdout needs both classes to refit the calibrator')
+    update.update({'parent_version': current.version, 'n_new': int(len(y)), 'data_path': data_path,
+                   'recalibrated': bool(refit)})
+    calibration = current.calibrator.method if current.calibrator is not None else 'none'
+    return write_artifacts(model_type, model, current.scaler, {'X_test': X_test, 'y_test': y_test},
+                           len(y_new), fit_seconds, started, artifacts_dir, new_version(),
+                           {'update': update}, calibration, publish, training=update,
+                           calibrator=None if refit else current.calibrator, headline_metrics=sufficient)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Update served models with newly labelled cases')
+    parser.add_argument('--model', action='append', required=True,
+                        help='lr, rf, svm or a full model type (repeatable)')
+    parser.add_argument('--data', required=True, help='CSV of new labelled cases')
+    parser.add_argument('--artifacts-dir', default=ARTIFACTS_DIR)
+    parser.add_argument('--holdout', type=float, default=0.2,
+                        help='share of the new cases used for calibration and metrics')
+    parser.add_argument('--epochs', type=int, default=UPDATE_EPOCHS, help='SGD passes for linear models')
+    parser.add_argument('--new-trees', type=int, default=NEW_TREES, help='trees grown per forest update')
+    parser.add_argument('--max-trees', type=int, default=None,
+                        help='trees kept per forest, oldest retired first (default: current count)')
+    parser.add_argument('--recalibrate', action=argparse.BooleanOptionalAction, default=None,
+                        help='refit the calibrator on the holdout even if it is small (or never); '
+                             f'by default only with {MIN_HOLDOUT_ROWS}+ rows and '
+                             f'{MIN_HOLDOUT_CLASS_ROWS}+ of each class')
+    args = parser.parse_args(argv)
+
+    try:
+        model_types = resolve_model_types(args.model)
+    except ValueError as e:
+        parser.error(str(e))
+
+    failed = False
+    for model_type in model_types:
+        try:
+            entry = update_model(model_type, args.data, args.artifacts_dir, args.holdout, args.epochs,
+                                 args.new_trees, args.max_trees, recalibrate=args.recalibrate)
+        except ValueError as e:
+            print(f'{model_type}: {e}', file=sys.stderr)
+            failed = True
+            continue
+        if 'metrics' in entry:
+            quality = f"f1 {entry['metrics']['f1']:.3f} on new cases"
+        else:
+            quality = f"holdout of {entry['holdout_metrics']['n_test']} too small for metrics"
+        calibrator = 'refit' if entry['update']['recalibrated'] else 'kept'
+        print(f"{model_type}: {entry['update']['parent_version']} -> {entry['version']} "
+              f"({entry['fit_seconds']:.2f}s, {quality}, calibrator {calibrator})", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
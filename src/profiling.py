@@ -0,0 +1,84 @@
+"""
+Opt-in sampling profiler for single requests.
+
+With FRAUD_PROFILING=1, a request carrying an `X-Profile: 1` header is
+sampled by a background thread that records the handling thread's Python
+stack every FRAUD_PROFILE_INTERVAL_MS (default 1ms). The response carries an
+X-Profile-Id header, and GET /profiles/<id> returns the samples as collapsed
+stacks ("outer;inner;leaf count" per line), the input format of flamegraph
+tools. Only the most recent profiles are kept.
+"""
+import itertools
+import os
+import sys
+import threading
+from collections import Counter, OrderedDict
+
+PROFILING_ENABLED = os.environ.get('FRAUD_PROFILING', '') == '1'
+PROFILE_INTERVAL = float(os.environ.get('FRAUD_PROFILE_INTERVAL_MS', 1)) / 1000
+MAX_PROFILES = 32
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread until stop() is called
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """
+    The last `maxsize` finished profiles, by id
+    """
+
+    def __init__(self, maxsize=MAX_PROFILES):
+        self.maxsize = maxsize
+        self._profiles = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, profiler):
+        with self._lock:
+            profile_id = str(next(self._ids))
+            self._profiles[profile_id] = profiler.folded()
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
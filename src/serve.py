@@ -0,0 +1,133 @@
+"""
+Production server for the fraud detection API.
+
+    python serve.py --workers 4 --threads 8 --bind 0.0.0.0:5000
+    python serve.py --async --workers 4
+
+Runs app.py under gunicorn (`app.run(debug=True)` is for development only).
+The master process imports the app and loads every model before forking, so
+the model arrays are shared copy-on-write by all workers instead of being
+unpickled once per worker. GET /ready turns green once the models are loaded.
+With FRAUD_RELOAD_INTERVAL=<seconds> every worker checks the artifacts that
+often and swaps in versions published by models.train or models.update.
+
+--async serves the app through an ASGI adapter on uvicorn workers, so slow
+clients are handled by the event loop and don't tie up a worker thread while
+their request or response is in flight. The Flask handlers still run in a
+pool of --threads threads per worker, so requests overlap (and the
+micro-batcher can coalesce them) just as in the default gthread mode.
+
+Every option can also be set with an environment variable (FRAUD_BIND,
+FRAUD_WORKERS, FRAUD_THREADS, FRAUD_TIMEOUT, FRAUD_GRACEFUL_TIMEOUT,
+FRAUD_ASYNC). Needs gunicorn; --async also needs uvicorn and a2wsgi.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def default_workers():
+    return min(2 * multiprocessing.cpu_count() + 1, 8)
+
+
+def preload_models():
+    """
+    Load every model in this process, then move all live objects into the
+    permanent GC generation so the garbage collector's bookkeeping writes
+    don't touch (and copy) the shared pages in forked workers
+    """
+    from models.registry import registry
+    registry.preload()
+    gc.collect()
+    gc.freeze()
+    return registry
+
+
+def _uvicorn_worker_class():
+    try:
+        import uvicorn_worker  # noqa: F401
+        return 'uvicorn_worker.UvicornWorker'
+    except ImportError:
+        return 'uvicorn.workers.UvicornWorker'
+
+
+def build_asgi_app(wsgi_app, threads=4):
+    # Not asgiref's WsgiToAsgi: it runs every request on one thread
+    from a2wsgi import WSGIMiddleware
+    return WSGIMiddleware(wsgi_app, workers=threads)
+
+
+class FraudServer(BaseApplication):
+
+    def __init__(self, options, use_async=False, threads=4):
+        self.options = options
+        self.use_async = use_async
+        self.threads = threads
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from app import app
+        preload_models()
+        return build_asgi_app(app, self.threads) if self.use_async else app
+
+
+def _on_exit(server):
+    server.log.info('Fraud detection server stopped')
+
+
+def _worker_exit(server, worker):
+    server.log.info('Worker %s finished in-flight requests and exited', worker.pid)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the fraud detection API under gunicorn')
+    parser.add_argument('--bind', default=os.environ.get('FRAUD_BIND', '0.0.0.0:5000'))
+    parser.add_argument('--workers', type=int, default=_env_int('FRAUD_WORKERS', default_workers()))
+    parser.add_argument('--threads', type=int, default=_env_int('FRAUD_THREADS', 4),
+                        help='request threads per worker')
+    parser.add_argument('--timeout', type=int, default=_env_int('FRAUD_TIMEOUT', 60))
+    parser.add_argument('--graceful-timeout', type=int, default=_env_int('FRAUD_GRACEFUL_TIMEOUT', 30),
+                        help='seconds workers get to finish in-flight requests on shutdown')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        default=os.environ.get('FRAUD_ASYNC', '') == '1',
+                        help='serve through ASGI on uvicorn workers')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'preload_app': True,
+        'on_exit': _on_exit,
+        'worker_exit': _worker_exit,
+    }
+    if args.use_async:
+        options['worker_class'] = _uvicorn_worker_class()
+    else:
+        options['worker_class'] = 'gthread'
+        options['threads'] = args.threads
+
+    # app.py imports its siblings as top-level modules
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    FraudServer(options, args.use_async, args.threads).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend modules the same way app.py does, from src/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    # The bundled pickles were written by an older scikit-learn
+    config.addinivalue_line('filterwarnings', 'ignore:Trying to unpickle estimator')
+    config.addinivalue_line('filterwarnings', 'ignore:X does not have valid feature names')
+
+
+@pytest.fixture
+def client():
+    import app
+    return app.app.test_client()
+
+
+@pytest.fixture
+def filing():
+    """A single valid /predict body, fresh for every test."""
+    return {
+        'incomeDeclared': 500000, 'businessRevenue': 100000, 'livingCost': 200000,
+        'luxurySpending': 50000, 'onlineSpending': 20000, 'propertyTax': 10000,
+        'carMaintenance': 5000, 'employeeSalary': 0,
+    }
+
+
+@pytest.fixture(scope='session')
+def training_csv(tmp_path_factory):
+    """Path to a small, noise-free labelled training CSV shared by the training tests."""
+    from benchmarks.synthetic import synthetic_training_frame
+    from models import train
+
+    df = synthetic_training_frame(600, seed=7, label_noise=0.0, target=train.TARGET)
+    path = tmp_path_factory.mktemp('data') / 'filings.csv'
+    df.to_csv(path, index=False)
+    return str(path)
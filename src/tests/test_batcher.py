@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+
+from batcher import MicroBatcher
+from benchmarks.synthetic import random_features
+from models.inference import score
+
+
+def test_concurrent_rows_are_coalesced_and_scattered():
+    calls = []
+
+    def score_fn(model_type, X):
+        calls.append(len(X))
+        return score(model_type, X)
+
+    batcher = MicroBatcher(score_fn, max_batch=16, max_wait=0.05)
+    X = random_features(16)
+    expected = score('logistic_regression', X)
+    results = [None] * len(X)
+    barrier = threading.Barrier(len(X))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher('logistic_regression', X[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(X))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i, (prediction, confidence) in enumerate(results):
+        assert prediction == expected[0][i]
+        assert confidence == expected[1][i]
+    assert sum(calls) == len(X)
+    assert len(calls) < len(X)
+
+    stats = batcher.stats()
+    assert stats['requests'] == len(X)
+    assert stats['batches'] == len(calls)
+    assert sum(stats['batch_size_histogram'].values()) == len(calls)
+    assert sum(stats['added_latency_ms']['histogram'].values()) == len(X)
+
+
+def test_rows_for_different_models_are_scored_separately():
+    seen = []
+
+    def score_fn(model_type, X):
+        seen.append(model_type)
+        return score(model_type, X)
+
+    batcher = MicroBatcher(score_fn, max_batch=8, max_wait=0.05)
+    X = random_features(2)
+    first = batcher.submit('svm', X[0])
+    second = batcher.submit('decision_tree', X[1])
+    assert first.result()[0] == score('svm', X[:1])[0][0]
+    assert second.result()[0] == score('decision_tree', X[1:])[0][0]
+    assert sorted(seen) == ['decision_tree', 'svm']
+
+
+def test_errors_reach_every_waiting_request():
+    def score_fn(model_type, X):
+        raise KeyError(model_type)
+
+    batcher = MicroBatcher(score_fn, max_batch=4, max_wait=0.01)
+    with pytest.raises(KeyError):
+        batcher('unknown', np.zeros(16))
+    assert batcher.stats()['errors'] == 1
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import random_features
+from models.bundle import export_bundle, load_bundle
+from models.calibration import IsotonicCalibrator
+from models.inference import predict_labels, score_matrix
+from models.registry import MODEL_TYPES, ModelRegistry, registry
+
+
+@pytest.fixture(scope='module')
+def bundled_registry(tmp_path_factory):
+    from models.bundle import export_current
+    artifacts_dir = str(tmp_path_factory.mktemp('artifacts'))
+    source = ModelRegistry(artifacts_dir=artifacts_dir, use_bundles=False)
+    for model_type in MODEL_TYPES:
+        export_current(model_type, source)
+    return ModelRegistry(artifacts_dir=artifacts_dir)
+
+
+@pytest.mark.parametrize('model_type', MODEL_TYPES)
+def test_bundle_scores_like_pickle(bundled_registry, model_type):
+    bundled = bundled_registry.get(model_type)
+    pickled = registry.get(model_type)
+    assert bundled.model is None
+    assert bundled.artifact_format == 'bundle'
+    assert bundled.version == pickled.version
+    assert bundled.model_class == type(pickled.model).__name__
+
+    X = random_features(3000)
+    expected_labels, expected_confidence = score_matrix(pickled, X)
+    labels, confidence = score_matrix(bundled, X)
+    np.testing.assert_array_equal(labels, expected_labels)
+    np.testing.assert_allclose(confidence, expected_confidence, rtol=1e-12)
+    np.testing.assert_array_equal(predict_labels(bundled, X), pickled.model.predict(pickled.scaler.transform(X)))
+    np.testing.assert_allclose(bundled.scaler.transform(X), pickled.scaler.transform(X))
+    assert bundled.explanation.top_factors(X[:5]) == pickled.explanation.top_factors(X[:5])
+
+
+def test_bundle_arrays_are_read_only_maps(bundled_registry):
+    forest = bundled_registry.get('random_forest').forest
+    assert isinstance(forest.threshold.base, np.memmap) or isinstance(forest.threshold, np.memmap)
+    with pytest.raises(ValueError):
+        forest.threshold[0] = 0.0
+
+
+def test_isotonic_calibrator_round_trip(tmp_path):
+    entry = registry.get('logistic_regression')
+    calibrator = IsotonicCalibrator([-2.0, 0.0, 3.0], [0.1, 0.4, 0.9])
+    path = export_bundle(entry.model, entry.scaler, str(tmp_path), 'logistic_regression', 'v1', calibrator)
+    loaded = load_bundle(path)['calibrator']
+    scores = np.linspace(-5, 5, 41)
+    np.testing.assert_array_equal(loaded(scores), calibrator(scores))
+
+
+def test_rejects_unsupported_models(tmp_path):
+    from sklearn.neighbors import KNeighborsClassifier
+    entry = registry.get('logistic_regression')
+    model = KNeighborsClassifier(n_neighbors=1).fit(random_features(10), np.arange(10) % 2)
+    with pytest.raises(ValueError):
+        export_bundle(model, entry.scaler, str(tmp_path), 'knn', 'v1')
+
+
+@pytest.mark.parametrize('model_type', MODEL_TYPES)
+def test_pickle_size_is_the_artifact_size_on_disk(model_type):
+    entry = registry.get(model_type)
+    artifact = registry.resolve(model_type)
+    paths = [artifact[key] for key in ('model', 'scaler', 'calibrator') if artifact[key]]
+    assert entry.info()['size_bytes'] == sum(os.path.getsize(path) for path in paths)
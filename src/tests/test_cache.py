@@ -0,0 +1,59 @@
+from cache import PredictionCache, canonical_inputs
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def key(name, model_type='svm'):
+    return (name, (model_type,))
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = PredictionCache(maxsize=2, ttl=60)
+    cache.put(key('a'), 1)
+    cache.put(key('b'), 2)
+    assert cache.get(key('a')) == 1
+    cache.put(key('c'), 3)
+
+    assert cache.get(key('b')) is None
+    assert cache.get(key('a')) == 1
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert (stats['hits'], stats['misses']) == (2, 1)
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = PredictionCache(maxsize=10, ttl=5, clock=clock)
+    cache.put(key('a'), 1)
+    clock.now = 4.9
+    assert cache.get(key('a')) == 1
+    clock.now = 5.0
+    assert cache.get(key('a')) is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_invalidate_drops_only_that_model():
+    cache = PredictionCache(maxsize=10, ttl=60)
+    cache.put(key('a', 'svm'), 1)
+    cache.put(key('a', 'random_forest'), 2)
+    cache.put(('a', ('svm', 'random_forest')), 3)
+    cache.invalidate('svm')
+
+    assert cache.get(key('a', 'random_forest')) == 2
+    assert cache.stats()['size'] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PredictionCache(maxsize=0)
+    cache.put(key('a'), 1)
+    assert cache.get(key('a')) is None
+
+
+def test_canonical_inputs_normalizes_numbers():
+    assert canonical_inputs([1, '2.50', -0.0]) == (1.0, 2.5, 0.0)
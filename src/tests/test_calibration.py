@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import app as app_module
+from models.calibration import fit_calibrator
+from models.registry import MODEL_TYPES
+
+
+def held_out_scores(n_rows=500, seed=0):
+    # Noisy labels whose fraud rate rises with the score
+    rng = np.random.default_rng(seed)
+    scores = rng.normal(0.0, 2.0, n_rows)
+    y = (rng.random(n_rows) < 1 / (1 + np.exp(-scores))).astype(int)
+    return scores, y
+
+
+@pytest.mark.parametrize('method', ['platt', 'isotonic'])
+def test_calibrated_probabilities_are_monotonic_and_bounded(method):
+    scores, y = held_out_scores()
+    calibrator = fit_calibrator(method, scores, y)
+    assert calibrator.method == method
+
+    # Beyond the fitted range too, and at extreme margins
+    grid = np.concatenate([[-1e6, -50.0], np.linspace(-10, 10, 2001), [50.0, 1e6]])
+    probability = calibrator(grid)
+    assert np.all(np.isfinite(probability))
+    assert np.all((probability >= 0.0) & (probability <= 1.0))
+    assert np.all(np.diff(probability) >= 0.0)
+    assert probability[0] < 0.5 < probability[-1]
+
+
+def test_no_calibration_and_unknown_methods():
+    scores, y = held_out_scores(50)
+    assert fit_calibrator('none', scores, y) is None
+    with pytest.raises(ValueError):
+        fit_calibrator('beta', scores, y)
+
+
+@pytest.mark.parametrize('model_type', MODEL_TYPES)
+def test_uncached_predictions_are_repeatable(client, filing, monkeypatch, model_type):
+    monkeypatch.setattr(app_module.prediction_cache, 'maxsize', 0)
+    body = dict(filing, modelType=model_type)
+    responses = [client.post('/predict', json=body) for _ in range(3)]
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.headers.get('X-Cache') != 'HIT' for response in responses)
+    confidences = {response.get_json()['confidence'] for response in responses}
+    assert len(confidences) == 1
+    assert 0.5 <= confidences.pop() <= 1.0
@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from benchmarks.synthetic import random_features
+from models import ensemble
+from models.ensemble import scaler_key, score_ensemble
+from models.inference import fraud_probability
+from models.registry import MODEL_TYPES, registry
+
+def model_probabilities(X, model_types=MODEL_TYPES):
+    return np.vstack([fraud_probability(registry.get(name), X) for name in model_types])
+
+
+def test_soft_voting_averages_probabilities():
+    X = random_features(200)
+    result = score_ensemble(X)
+    np.testing.assert_allclose(result['probability'], model_probabilities(X).mean(axis=0))
+    np.testing.assert_array_equal(result['predictions'], result['probability'] > 0.5)
+    for name in MODEL_TYPES:
+        np.testing.assert_allclose(result['models'][name]['probability'],
+                                   fraud_probability(registry.get(name), X))
+
+
+def test_hard_voting_takes_the_weighted_share_of_flags():
+    X = random_features(200, seed=1)
+    weights = {'random_forest': 3, 'svm': 1}
+    result = score_ensemble(X, ['random_forest', 'svm'], weights, voting='hard')
+    flags = (model_probabilities(X, ['random_forest', 'svm']) > 0.5).astype(float)
+    np.testing.assert_allclose(result['probability'], (3 * flags[0] + flags[1]) / 4)
+
+
+def test_weights_scale_each_model():
+    X = random_features(100, seed=2)
+    result = score_ensemble(X, weights={'logistic_regression': 2.5, 'decision_tree': 0})
+    probabilities = model_probabilities(X)
+    weight = np.array([2.5 if name == 'logistic_regression' else 0 if name == 'decision_tree' else 1
+                       for name in MODEL_TYPES])
+    np.testing.assert_allclose(result['probability'], weight @ probabilities / weight.sum())
+
+
+def test_identical_scalers_are_applied_once(monkeypatch):
+    # Force every model through its scaler instead of the compiled paths
+    monkeypatch.setattr(ensemble, 'uses_compiled', lambda entry, n_rows: False)
+    transforms = []
+    original = StandardScaler.transform
+    monkeypatch.setattr(StandardScaler, 'transform',
+                        lambda self, X, *args, **kwargs: transforms.append(self) or original(self, X))
+
+    X = random_features(50, seed=3)
+    expected = model_probabilities(X).mean(axis=0)
+    transforms.clear()
+    result = score_ensemble(X)
+    distinct = len({scaler_key(registry.get(name).scaler) for name in MODEL_TYPES})
+    assert result['distinct_scalers'] == len(transforms) == distinct
+    np.testing.assert_allclose(result['probability'], expected, atol=1e-12)
+
+
+@pytest.mark.parametrize('options', [
+    {'weights': {'svm': None}},
+    {'weights': {'svm': 'nan'}},
+    {'weights': {'svm': float('nan')}},
+    {'weights': {'svm': float('inf')}},
+    {'weights': {'svm': True}},
+    {'weights': {'svm': -1}},
+    {'weights': {name: 0 for name in MODEL_TYPES}},
+    {'weights': {'rf': 2}},
+    {'weights': {'svm': 2}, 'ensembleModels': ['random_forest']},
+    {'ensembleModels': [1, 'svm']},
+    {'ensembleModels': 'svm'},
+    {'voting': 'majority'},
+])
+def test_invalid_ensemble_options_are_rejected(client, options, filing):
+    # Sent as text so NaN and Infinity reach the server as JSON literals
+    body = json.dumps(dict(filing, modelType='ensemble', **options))
+    response = client.post('/predict', data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    # Nothing was cached: the same request fails again
+    assert client.post('/predict', data=body, content_type='application/json').status_code == 400
+
+    batch = json.dumps(dict(options, modelType='ensemble', records=[filing]))
+    assert client.post('/predict_batch', data=batch, content_type='application/json').status_code == 400
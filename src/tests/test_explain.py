@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from features import FEATURE_COLUMNS, FEATURE_NAMES
+from models.explain import FALLBACK_IMPORTANCE, ExplanationTable, build_explanation_table
+
+RATIO_COLUMNS = ['Income to Expense Ratio', 'Spending to Income Ratio', 'Income Difference']
+
+
+def row_with(values, feature_names=FEATURE_NAMES):
+    # Every other column at 10, so the row mean stays well away from the ratio thresholds
+    row = np.full(len(feature_names), 10.0)
+    for name, value in values.items():
+        row[list(feature_names).index(name)] = value
+    return row.reshape(1, -1)
+
+
+def directions(table, X):
+    return dict(zip(table.feature_names, table.directions(X)[0].tolist()))
+
+
+@pytest.mark.parametrize('feature_names', [FEATURE_NAMES, FEATURE_COLUMNS])
+@pytest.mark.parametrize('values, expected', [
+    # Income to expense is "high" from 1.0 inclusive, spending to income only above 0.8
+    ({'Income to Expense Ratio': 1.0, 'Spending to Income Ratio': 0.8, 'Income Difference': 0.0},
+     ['high', 'low', 'low']),
+    ({'Income to Expense Ratio': 0.99, 'Spending to Income Ratio': 0.81, 'Income Difference': 1.0},
+     ['low', 'high', 'high']),
+])
+def test_ratio_features_use_fixed_thresholds(feature_names, values, expected):
+    # Display names and the renamed snake_case columns follow the same rules
+    renamed = dict(zip(FEATURE_NAMES, feature_names))
+    table = ExplanationTable(np.ones(len(feature_names)), feature_names=feature_names)
+    result = directions(table, row_with({renamed[name]: value for name, value in values.items()},
+                                        feature_names))
+    assert [result[renamed[name]] for name in RATIO_COLUMNS] == expected
+
+
+def test_other_features_compare_against_the_row_mean():
+    table = ExplanationTable(np.ones(len(FEATURE_NAMES)))
+    result = directions(table, row_with({'Luxury Spending': 1000.0, 'Living Cost': 0.0}))
+    assert result['Luxury Spending'] == 'high'
+    assert result['Living Cost'] == 'low'
+
+
+def test_top_factors_follow_importance_with_stable_ties():
+    importance = np.zeros(len(FEATURE_NAMES))
+    importance[[3, 9, 13]] = [0.5, 0.2, 0.2]
+    table = ExplanationTable(importance)
+    X = np.vstack([row_with({}), row_with({'Luxury Spending': 1000.0})])
+    factors = table.top_factors(X, top_k=3)
+    assert len(factors) == 2
+    assert [factor['feature'] for factor in factors[1]] == [
+        'Luxury Spending', 'Income to Expense Ratio', 'Spending to Income Ratio']
+    assert factors[1][0] == {'feature': 'Luxury Spending', 'importance': 0.5, 'value': 1000.0,
+                             'direction': 'high'}
+    assert factors[0][0]['value'] == 10.0
+
+
+def test_linear_tables_rank_by_coefficient_and_report_its_sign():
+    class Linear:
+        coef_ = np.array([[0.0] * 14 + [-3.0, 1.0]])
+
+    table = build_explanation_table(Linear())
+    assert table.is_linear
+    np.testing.assert_allclose(table.importance[-2:], [0.75, 0.25])
+    factors = table.top_factors(row_with({}), top_k=2)[0]
+    assert [(f['feature'], f['direction']) for f in factors] == [
+        ('High Value Purchase Flag', 'negative'), ('Excessive Spending Flag', 'positive')]
+
+
+def test_models_without_importances_use_the_fallback_ranking():
+    table = build_explanation_table(object())
+    np.testing.assert_array_equal(table.importance, FALLBACK_IMPORTANCE)
+    assert not table.is_linear
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import feature_store
+from benchmarks.synthetic import synthetic_training_frame
+from feature_store import FeatureStore
+from features import FEATURE_COLUMNS, RAW_COLUMNS, engineer_features
+from models import train
+
+
+def filings(n_rows, seed=0):
+    df = synthetic_training_frame(n_rows, seed=seed, label_noise=0.0, target=train.TARGET)
+    df.insert(0, 'taxpayer_id', [f'TP{i:06d}' for i in range(n_rows)])
+    df.insert(1, 'filing_year', 2023)
+    return df
+
+
+def test_only_new_or_changed_filings_are_engineered(tmp_path, monkeypatch):
+    df = filings(300)
+    store = FeatureStore(str(tmp_path))
+    features, stats = store.upsert_frame(df)
+    assert stats == {'added': 300, 'changed': 0, 'unchanged': 0}
+    np.testing.assert_array_equal(features, df[FEATURE_COLUMNS].to_numpy())
+
+    calls = []
+    original = feature_store.engineer_features
+    monkeypatch.setattr(feature_store, 'engineer_features', lambda raw: calls.append(len(raw)) or original(raw))
+
+    changed = df.copy()
+    changed.loc[5, 'luxury_spending'] += 1000
+    changed.loc[7, train.TARGET] = 1 - changed.loc[7, train.TARGET]
+    next_year = df.head(10).assign(filing_year=2024)
+    features, stats = store.upsert_frame(pd.concat([changed, next_year], ignore_index=True))
+    assert stats == {'added': 10, 'changed': 2, 'unchanged': 298}
+    assert calls == [12]
+    np.testing.assert_array_equal(features[5], engineer_features(changed.loc[5, RAW_COLUMNS].to_numpy())[0])
+
+    # Reopened from disk, without recomputing anything
+    reopened = FeatureStore(str(tmp_path))
+    assert len(reopened) == 310
+    X, y = reopened.training_data()
+    assert len(X) == 310
+    features, stats = reopened.upsert_frame(changed.drop(columns=[train.TARGET]))
+    assert stats['unchanged'] == 300 and calls == [12]
+
+
+def test_stale_feature_version_is_recomputed_and_compacted(tmp_path, monkeypatch):
+    df = filings(50)
+    store = FeatureStore(str(tmp_path))
+    store.upsert_frame(df)
+    monkeypatch.setattr(feature_store, 'FEATURES_VERSION', 2)
+    _, stats = store.upsert_frame(df)
+    assert stats['changed'] == 50
+
+    monkeypatch.setattr(feature_store, 'MAX_SEGMENTS', 3)
+    store.upsert_frame(filings(5).assign(filing_year=2022))
+    info = FeatureStore(str(tmp_path)).info()
+    assert info['segments'] == 1
+    assert info['rows'] == info['stored_rows'] == 55
+
+
+def test_training_and_scoring_read_the_store(tmp_path):
+    df = filings(400, seed=3)
+    csv_path = tmp_path / 'filings.csv'
+    df.to_csv(csv_path, index=False)
+    store_dir = str(tmp_path / 'store')
+    assert feature_store.main(['ingest', str(csv_path), '--store', store_dir]) == 0
+
+    from_store, digest, _ = train.load_prepared(store_dir, None)
+    from_csv, _, _ = train.load_prepared(str(csv_path), None)
+    assert digest == feature_store.store_digest(store_dir)
+    np.testing.assert_array_equal(from_store['X_test'], from_csv['X_test'])
+
+    from models.score import score_file
+    plain, through_store = tmp_path / 'plain.csv', tmp_path / 'stored.csv'
+    score_file(str(csv_path), str(plain), 'random_forest')
+    score_file(str(csv_path), str(through_store), 'random_forest', store=FeatureStore(store_dir))
+    pd.testing.assert_frame_equal(pd.read_csv(plain), pd.read_csv(through_store))
+
+
+def test_missing_key_columns_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match='taxpayer_id'):
+        FeatureStore(str(tmp_path)).upsert_frame(filings(5).drop(columns=['taxpayer_id']))
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import random_features
+from models.forest import FlatForest
+from models.registry import registry
+
+
+def sklearn_probability(entry, X):
+    return entry.model.predict_proba(entry.scaler.transform(X))[:, 1]
+
+
+@pytest.mark.parametrize('model_type', ['random_forest', 'decision_tree'])
+def test_flat_forest_matches_sklearn_exactly(model_type):
+    entry = registry.get(model_type)
+    X = random_features(2000)
+    np.testing.assert_array_equal(entry.forest.predict_proba(X), sklearn_probability(entry, X))
+
+
+@pytest.mark.parametrize('model_type', ['random_forest', 'decision_tree'])
+def test_folded_thresholds_agree_at_split_boundaries(model_type):
+    entry = registry.get(model_type)
+    forest = entry.forest
+    nodes = np.flatnonzero(forest.left >= 0)[:300]
+
+    # Put one feature exactly on each folded threshold and one ulp either side
+    rows = np.repeat(random_features(1, seed=1), 3 * len(nodes), axis=0)
+    for i, node in enumerate(nodes):
+        threshold = forest.threshold[node]
+        column = forest.feature[node]
+        rows[3 * i, column] = threshold
+        rows[3 * i + 1, column] = np.nextafter(threshold, np.inf)
+        rows[3 * i + 2, column] = np.nextafter(threshold, -np.inf)
+
+    np.testing.assert_array_equal(forest.predict_proba(rows), sklearn_probability(entry, rows))
+
+
+def test_unfolded_forest_takes_scaled_rows():
+    entry = registry.get('random_forest')
+    X = random_features(300, seed=2)
+    flat = FlatForest.from_model(entry.model)
+    np.testing.assert_array_equal(flat.predict_proba(entry.scaler.transform(X)), sklearn_probability(entry, X))
+
+
+def test_contributions_sum_to_probability():
+    entry = registry.get('random_forest')
+    X = random_features(200, seed=3)
+    bias, contributions = entry.forest.contributions(X)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), sklearn_probability(entry, X), atol=1e-12)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import random_features
+from models.calibration import raw_scores
+from models.linear import CompiledLinear
+from models.registry import registry
+
+
+@pytest.mark.parametrize('model_type', ['logistic_regression', 'svm'])
+def test_compiled_linear_matches_sklearn(model_type):
+    entry = registry.get(model_type)
+    X = random_features(500)
+    expected = raw_scores(entry.model, entry.scaler.transform(X))
+
+    compiled = CompiledLinear.from_model(entry.model, entry.scaler)
+    np.testing.assert_allclose(compiled.raw_scores(X), expected, rtol=1e-9, atol=1e-12)
+
+    scaled = entry.scaler.transform(X)
+    np.testing.assert_allclose(compiled.decision_function(X), entry.model.decision_function(scaled),
+                               rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(compiled.decision_function(X) > 0, entry.model.predict(scaled) == 1)
+
+
+@pytest.mark.parametrize('model_type', ['logistic_regression', 'svm'])
+def test_compiled_linear_float32(model_type):
+    entry = registry.get(model_type)
+    X = random_features(500, seed=1)
+    expected = entry.model.decision_function(entry.scaler.transform(X))
+
+    compiled = CompiledLinear.from_model(entry.model, entry.scaler, np.float32)
+    decision = compiled.decision_function(X)
+    assert decision.dtype == np.float32
+    np.testing.assert_allclose(decision, expected, rtol=1e-4, atol=1e-3 * np.abs(expected).max())
+
+
+def test_compiled_linear_single_row():
+    entry = registry.get('logistic_regression')
+    X = random_features(1, seed=2)
+    expected = raw_scores(entry.model, entry.scaler.transform(X))
+    np.testing.assert_allclose(entry.linear.raw_scores(X[0]), expected, rtol=1e-9)
@@ -0,0 +1,50 @@
+from benchmarks.load_test import InProcessTarget, compare, run_scenarios
+from benchmarks.synthetic import synthetic_filings, synthetic_raw
+from features import REQUEST_FIELDS
+
+
+def summary(p95_ms=10.0, rows_per_sec=1000.0, errors=0):
+    return {'p95_ms': p95_ms, 'rows_per_sec': rows_per_sec, 'errors': errors}
+
+
+def test_synthetic_filings_are_reproducible_requests():
+    filings = synthetic_filings(50, seed=3)
+    assert filings == synthetic_filings(50, seed=3)
+    assert all(set(filing) == set(REQUEST_FIELDS) for filing in filings)
+    assert (synthetic_raw(50) >= 0).all()
+
+
+def test_compare_flags_latency_throughput_and_errors():
+    baseline = {'a': summary(), 'b': summary(), 'c': summary(), 'gone': summary()}
+    results = {
+        'a': summary(p95_ms=16.0),
+        'b': summary(rows_per_sec=400.0),
+        'c': summary(p95_ms=12.0, rows_per_sec=900.0, errors=1),
+        'new': summary(),
+    }
+    regressions = compare(results, baseline, threshold=0.5)
+    assert [line.split(':')[0] for line in regressions] == ['a', 'b', 'c']
+
+
+def test_small_latency_changes_are_ignored():
+    assert compare({'a': summary(p95_ms=0.3)}, {'a': summary(p95_ms=0.1)}) == []
+
+
+def test_scenarios_run_against_the_app():
+    import app
+    target = InProcessTarget()
+    hits = app.prediction_cache.hits
+    try:
+        results = run_scenarios(target, ['decision_tree'], n_requests=3, concurrency=2,
+                                batch_size=5, n_batches=2, cold_repeats=1, rounds=2)
+    finally:
+        target.close()
+    # Replayed rounds must score, not hit the cache
+    assert app.prediction_cache.hits == hits
+    assert app.prediction_cache.enabled
+    assert set(results) == {
+        f'decision_tree/{scenario}/{state}'
+        for scenario in ('single', 'batch', 'batch/explain') for state in ('warm', 'cold')
+    }
+    assert all(result['errors'] == 0 for result in results.values())
+    assert results['decision_tree/batch/warm']['rows'] == 10
@@ -0,0 +1,107 @@
+import pytest
+
+import app as app_module
+from metrics import ERRORS, MetricsRegistry
+from models.registry import registry
+from profiling import SamplingProfiler
+
+def test_prometheus_text_format():
+    metrics = MetricsRegistry()
+    counter = metrics.counter('things_total', 'Things', ('kind',))
+    histogram = metrics.histogram('wait_seconds', 'Waits', buckets=(0.1, 1.0))
+    counter.inc(kind='a')
+    counter.inc(2, kind='a"b')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = metrics.render().splitlines()
+    assert '# TYPE things_total counter' in lines
+    assert 'things_total{kind="a"} 1' in lines
+    assert 'things_total{kind="a\\"b"} 2' in lines
+    assert 'wait_seconds_bucket{le="0.1"} 1' in lines
+    assert 'wait_seconds_bucket{le="1.0"} 2' in lines
+    assert 'wait_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'wait_seconds_count 3' in lines
+    with pytest.raises(ValueError):
+        counter.inc(other='x')
+
+
+def test_metrics_endpoint_reports_stages_and_requests(client, filing):
+    assert client.post('/predict', json=dict(filing, modelType='decision_tree')).status_code == 200
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert 'fraud_stage_seconds_count{endpoint="predict",stage="parse",model=""}' in body
+    for stage in ('validate', 'features', 'model_lookup', 'score', 'explain', 'serialize'):
+        assert f'endpoint="predict",stage="{stage}",model="decision_tree"' in body
+    assert 'fraud_http_requests_total{endpoint="predict",status="200"}' in body
+    assert 'fraud_model_load_seconds{model="decision_tree"' in body
+
+
+def test_random_fallback_is_counted(client, monkeypatch, filing):
+    def broken(model_type):
+        raise OSError('artifact missing')
+
+    monkeypatch.setattr(app_module.prediction_cache, 'maxsize', 0)
+    monkeypatch.setattr(registry, 'get', broken)
+    fallback = ERRORS.get(path='confidence_fallback', model='svm') or 0
+    predict = ERRORS.get(path='predict', model='svm') or 0
+    response = client.post('/predict', json=dict(filing, modelType='svm'))
+    assert response.status_code == 200
+    assert response.get_json()['top_contributing_factors'] == []
+    assert ERRORS.get(path='confidence_fallback', model='svm') == fallback + 1
+    assert (ERRORS.get(path='predict', model='svm') or 0) == predict
+
+
+def test_failed_scoring_is_counted_once(client, monkeypatch, filing):
+    def broken(model_type):
+        raise OSError('artifact missing')
+
+    monkeypatch.setattr(app_module.prediction_cache, 'maxsize', 16)
+    monkeypatch.setattr(registry, 'get', broken)
+    failed = ERRORS.get(path='score_failed', model='svm') or 0
+    predict = ERRORS.get(path='predict', model='svm') or 0
+    response = client.post('/predict', json=dict(filing, modelType='svm', incomeDeclared=123457))
+    assert response.status_code == 500
+    assert ERRORS.get(path='score_failed', model='svm') == failed + 1
+    assert (ERRORS.get(path='predict', model='svm') or 0) == predict
+
+
+def test_reloaded_versions_leave_no_stale_series(client, monkeypatch, filing):
+    client.post('/predict', json=dict(filing, modelType='decision_tree'))
+    info = registry.info()
+    body = client.get('/metrics').get_data(as_text=True)
+    version = info['decision_tree']['version']
+    assert f'fraud_model_info{{model="decision_tree",version="{version}"' in body
+
+    info['decision_tree']['version'] = 'next'
+    monkeypatch.setattr(registry, 'info', lambda: info)
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'model="decision_tree",version="next"' in body
+    assert f'version="{version}"' not in body
+    assert body.count('fraud_model_load_seconds{model="decision_tree"') == 1
+
+
+def test_unknown_model_types_share_one_label(client, filing):
+    client.post('/predict', json=dict(filing, modelType='no_such_model_123'))
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'no_such_model_123' not in body
+
+
+def test_profiled_request(client, monkeypatch, filing):
+    monkeypatch.setattr(app_module, 'PROFILING_ENABLED', True)
+    response = client.post('/predict_batch?modelType=random_forest&explain=1',
+                           json=[filing] * 2000, headers={'X-Profile': '1'})
+    assert response.status_code == 200
+    profile = client.get(f"/profiles/{response.headers['X-Profile-Id']}")
+    assert profile.status_code == 200
+    assert 'app.py:predict_batch' in profile.get_data(as_text=True)
+    assert client.get('/profiles/does-not-exist').status_code == 404
+
+
+def test_profiler_without_samples_is_empty():
+    import threading
+    profiler = SamplingProfiler(threading.get_ident(), interval=10).start().stop()
+    assert profiler.folded() == ''
@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_filings
+from features import engineer_features, raw_from_records
+from models.inference import score
+
+
+def expected_results(model_type, records):
+    predictions, confidence = score(model_type, engineer_features(raw_from_records(records)))
+    return [{'fraud_detected': bool(p), 'confidence': c}
+            for p, c in zip(predictions.tolist(), confidence.tolist())]
+
+
+def test_json_array_results_follow_input_order(client):
+    records = synthetic_filings(40, seed=1)
+    response = client.post('/predict_batch?modelType=random_forest', json=records)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['modelType'] == 'random_forest' and body['count'] == 40
+    assert body['results'] == expected_results('random_forest', records)
+
+    reversed_body = client.post('/predict_batch?modelType=random_forest', json=records[::-1]).get_json()
+    assert reversed_body['results'] == body['results'][::-1]
+
+
+def test_ndjson_body(client):
+    records = synthetic_filings(25, seed=2)
+    ndjson = '\n'.join(json.dumps(record) for record in records) + '\n\n'
+    response = client.post('/predict_batch?modelType=svm', data=ndjson, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.get_json()['results'] == expected_results('svm', records)
+
+    response = client.post('/predict_batch?modelType=svm', data=ndjson + '{not json\n',
+                           content_type='application/x-ndjson')
+    assert response.status_code == 400
+
+
+def test_bad_record_is_rejected_with_its_index(client):
+    records = synthetic_filings(5, seed=3)
+    missing = [dict(record) for record in records]
+    del missing[3]['livingCost']
+    response = client.post('/predict_batch', json={'modelType': 'decision_tree', 'records': missing})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Record 3: missing field: livingCost'
+
+    non_numeric = [dict(record) for record in records]
+    non_numeric[2]['luxurySpending'] = 'a lot'
+    response = client.post('/predict_batch', json={'modelType': 'decision_tree', 'records': non_numeric})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Record 2: non-numeric input'
+
+    for value in (None, 'NaN', 'inf'):
+        bad = [dict(record) for record in records]
+        bad[4]['incomeDeclared'] = value
+        response = client.post('/predict_batch', json={'modelType': 'decision_tree', 'records': bad})
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Record 4: non-numeric input'
+
+    response = client.post('/predict_batch', json={'modelType': 'unknown', 'records': records})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('value', [None, 'NaN', 'a lot'])
+def test_predict_rejects_non_numeric_input(client, value):
+    from metrics import ERRORS
+    record = dict(synthetic_filings(1, seed=6)[0], modelType='svm', incomeDeclared=value)
+    validation = ERRORS.get(path='validation', model='svm') or 0
+    predict = ERRORS.get(path='predict', model='svm') or 0
+    response = client.post('/predict', json=record)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Record 0: non-numeric input'
+    assert ERRORS.get(path='validation', model='svm') == validation + 1
+    assert (ERRORS.get(path='predict', model='svm') or 0) == predict
+
+
+@pytest.mark.parametrize('model_type', ['logistic_regression', 'random_forest'])
+def test_explanations_only_when_requested(client, model_type):
+    records = synthetic_filings(10, seed=4)
+    plain = client.post('/predict_batch', json={'modelType': model_type, 'records': records}).get_json()
+    assert all('top_contributing_factors' not in result for result in plain['results'])
+    for flag in (False, 'false', '0', 0):
+        body = client.post('/predict_batch', json={'modelType': model_type, 'records': records,
+                                                   'explain': flag}).get_json()
+        assert body['results'] == plain['results']
+
+    for response in (
+        client.post('/predict_batch', json={'modelType': model_type, 'records': records, 'explain': True}),
+        client.post('/predict_batch', json={'modelType': model_type, 'records': records, 'explain': 'true'}),
+        client.post(f'/predict_batch?modelType={model_type}&explain=1', json=records),
+    ):
+        results = response.get_json()['results']
+        assert all(len(result['top_contributing_factors']) > 0 for result in results)
+        # Explanations don't change the scores
+        assert [{k: r[k] for k in ('fraud_detected', 'confidence')} for r in results] == plain['results']
+
+
+def test_large_batch_matches_single_predictions(client):
+    records = synthetic_filings(300, seed=5)
+    results = client.post('/predict_batch?modelType=logistic_regression', json=records).get_json()['results']
+    for index in (0, 150, 299):
+        single = client.post('/predict', json=dict(records[index], modelType='logistic_regression')).get_json()
+        assert single['fraud_detected'] == results[index]['fraud_detected']
+        np.testing.assert_allclose(single['confidence'], results[index]['confidence'])
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('gunicorn')
+pytest.importorskip('a2wsgi')
+
+from serve import build_asgi_app  # noqa: E402
+
+
+def slow_wsgi_app(environ, start_response):
+    time.sleep(0.2)
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [threading.current_thread().name.encode()]
+
+
+async def call(asgi_app):
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': '/', 'raw_path': b'/', 'root_path': '', 'query_string': b'',
+             'headers': [], 'server': ('testserver', 80), 'client': ('127.0.0.1', 1234)}
+    await asgi_app(scope, receive, send)
+    assert sent[0]['status'] == 200
+    return b''.join(message.get('body', b'') for message in sent[1:]).decode()
+
+
+def test_async_mode_runs_requests_concurrently():
+    asgi_app = build_asgi_app(slow_wsgi_app, threads=8)
+
+    async def run():
+        return await asyncio.gather(*(call(asgi_app) for _ in range(8)))
+
+    start = time.perf_counter()
+    threads = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    # Serially these would take 1.6s
+    assert elapsed < 0.8
+    assert len(set(threads)) > 1
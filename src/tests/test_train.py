@@ -0,0 +1,69 @@
+import json
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from models import train
+from models.registry import ModelRegistry, read_manifest
+
+
+def test_prepared_data_is_cached_by_content(training_csv, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    first, digest, hit = train.load_prepared(training_csv, cache_dir)
+    assert not hit
+    second, same_digest, hit = train.load_prepared(training_csv, cache_dir)
+    assert hit and same_digest == digest
+    np.testing.assert_array_equal(first['X_train'], second['X_train'])
+    np.testing.assert_array_equal(first['scaler'].mean_, second['scaler'].mean_)
+
+
+def test_parallel_training_publishes_every_model_with_metrics(training_csv, tmp_path):
+    artifacts_dir = str(tmp_path / 'artifacts')
+    assert train.main(['--model', 'all', '--data', training_csv, '--artifacts-dir', artifacts_dir,
+                       '--workers', '2']) == 0
+
+    manifest = read_manifest(artifacts_dir)['models']
+    assert set(manifest) == set(train.MODEL_TYPES)
+    for model_type, entry in manifest.items():
+        out_dir = os.path.join(artifacts_dir, model_type, entry['version'])
+        with open(os.path.join(out_dir, 'metrics.json')) as f:
+            report = json.load(f)
+        assert report['fit_seconds'] > 0
+        assert 0.5 < report['metrics']['accuracy'] <= 1.0
+        assert entry['metrics']['f1'] == report['metrics']['f1']
+
+    registry = ModelRegistry(artifacts_dir=artifacts_dir)
+    registry.preload()
+    assert {info['format'] for info in registry.info().values()} == {'bundle'}
+
+
+def test_hyperparameter_search(training_csv, tmp_path):
+    data, _, _ = train.load_prepared(training_csv, None)
+    entry = train.train_model('decision_tree', data, str(tmp_path), search={'method': 'random', 'n_iter': 3})
+    assert set(entry['search']['best_params']) <= set(train.SEARCH_SPACES['decision_tree'])
+    with open(os.path.join(str(tmp_path), 'decision_tree', entry['version'], 'metrics.json')) as f:
+        assert json.load(f)['search']['candidates'] == 3
+
+
+@pytest.mark.parametrize('method', ['grid', 'random'])
+def test_logistic_regression_search_is_warning_free(training_csv, tmp_path, method):
+    data, _, _ = train.load_prepared(training_csv, None)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        entry = train.train_model('logistic_regression', data, str(tmp_path),
+                                  search={'method': method, 'n_iter': 4})
+    assert 'l1_ratio' in entry['search']['best_params']
+
+
+def test_streaming_svm_trains_out_of_core(training_csv, tmp_path):
+    entry = train.train_svm_streaming(training_csv, str(tmp_path), chunk_rows=100, epochs=3)
+    assert entry['model_class'] == 'SGDClassifier'
+    assert entry['training']['chunk_rows'] == 100
+    assert entry['metrics']['accuracy'] > 0.8
+
+    registry = ModelRegistry(artifacts_dir=str(tmp_path))
+    loaded = registry.get('svm')
+    assert loaded.artifact_format == 'bundle'
+    assert loaded.linear is not None
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from benchmarks.synthetic import synthetic_training_frame
+from models import train, update
+from models.registry import ModelRegistry, read_manifest
+
+
+@pytest.fixture(scope='module')
+def artifacts_dir(tmp_path_factory, training_csv):
+    artifacts_dir = str(tmp_path_factory.mktemp('artifacts'))
+    assert train.main(['--model', 'lr', '--model', 'rf', '--model', 'dt', '--data', training_csv,
+                       '--artifacts-dir', artifacts_dir, '--workers', '1']) == 0
+    return artifacts_dir
+
+
+@pytest.fixture
+def new_cases(tmp_path):
+    df = synthetic_training_frame(200, seed=11, label_noise=0.0, target=train.TARGET)
+    path = tmp_path / 'new_cases.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_linear_update_publishes_a_new_version(artifacts_dir, new_cases):
+    parent = read_manifest(artifacts_dir)['models']['logistic_regression']['version']
+    entry = update.update_model('logistic_regression', new_cases, artifacts_dir)
+    assert entry['version'] != parent
+    assert entry['update']['parent_version'] == parent
+    assert entry['model_class'] == 'SGDClassifier'
+    assert read_manifest(artifacts_dir)['models']['logistic_regression']['version'] == entry['version']
+
+    # An SGD model keeps training with partial_fit from here on
+    again = update.update_model('logistic_regression', new_cases, artifacts_dir, epochs=2)
+    assert again['update']['parent_version'] == entry['version']
+    loaded = ModelRegistry(artifacts_dir=artifacts_dir).get('logistic_regression')
+    assert loaded.version == again['version']
+
+
+def test_forest_update_grows_and_retires_trees(artifacts_dir, new_cases):
+    registry = ModelRegistry(artifacts_dir=artifacts_dir, use_bundles=False)
+    old = registry.get('random_forest').model
+    entry = update.update_model('random_forest', new_cases, artifacts_dir, new_trees=5)
+    assert entry['update']['n_trees'] == len(old.estimators_)
+
+    registry.reload('random_forest')
+    model = registry.get('random_forest').model
+    assert len(model.estimators_) == len(old.estimators_)
+    # Oldest trees retired, the remaining ones kept in order
+    assert [tree.tree_.node_count for tree in model.estimators_[:-5]] == \
+           [tree.tree_.node_count for tree in old.estimators_[5:]]
+
+
+def _cases(tmp_path, n_rows, seed):
+    path = tmp_path / f'cases_{n_rows}.csv'
+    synthetic_training_frame(n_rows, seed=seed, label_noise=0.0, target=train.TARGET).to_csv(path, index=False)
+    return str(path)
+
+
+def test_small_batch_keeps_the_parent_calibrator(artifacts_dir, tmp_path):
+    registry = ModelRegistry(artifacts_dir=artifacts_dir, use_bundles=False)
+    parent = registry.get('logistic_regression').calibrator
+    entry = update.update_model('logistic_regression', _cases(tmp_path, 30, 5), artifacts_dir)
+    assert not entry['update']['recalibrated']
+    assert 'metrics' not in entry and entry['holdout_metrics']['n_test'] == 6
+    assert 'metrics' not in read_manifest(artifacts_dir)['models']['logistic_regression']
+
+    registry.reload('logistic_regression')
+    kept = registry.get('logistic_regression').calibrator
+    assert (kept.a, kept.b) == (parent.a, parent.b)
+
+    # Only on request
+    entry = update.update_model('logistic_regression', _cases(tmp_path, 30, 5), artifacts_dir,
+                                recalibrate=True)
+    assert entry['update']['recalibrated'] and 'metrics' not in entry
+
+
+def test_sufficient_holdout_refits_the_calibrator(artifacts_dir, tmp_path):
+    entry = update.update_model('logistic_regression', _cases(tmp_path, 1000, 9), artifacts_dir)
+    assert entry['update']['recalibrated']
+    assert 0.5 < entry['metrics']['f1'] <= 1.0
+
+
+def test_decision_tree_cannot_be_updated(artifacts_dir, new_cases):
+    with pytest.raises(ValueError):
+        update.update_model('decision_tree', new_cases, artifacts_dir)
+
+
+def test_watcher_reloads_published_versions(artifacts_dir, new_cases):
+    registry = ModelRegistry(artifacts_dir=artifacts_dir)
+    before = registry.get('random_forest').version
+    assert registry.start_watcher(0.05)
+    try:
+        assert registry.start_watcher(0.05)
+        watcher = registry._watcher_thread
+
+        entry = update.update_model('random_forest', new_cases, artifacts_dir, new_trees=2)
+        deadline = time.monotonic() + 5
+        while registry.get('random_forest').version == before and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert registry.get('random_forest').version == entry['version']
+    finally:
+        assert registry.stop_watcher(timeout=5)
+    assert not watcher.is_alive()
+    assert not registry.stop_watcher()